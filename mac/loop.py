@@ -4,23 +4,34 @@ Sends messages to the Claude API, executes computer tool calls via MacTool,
 and returns results until the model stops issuing tool calls.
 """
 
+import asyncio
+import json
 import logging
 import platform
 import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
 from datetime import datetime
 
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
 from anthropic.types.beta import (
     BetaContentBlockParam,
     BetaImageBlockParam,
     BetaMessage,
     BetaMessageParam,
+    BetaRedactedThinkingBlock,
+    BetaRedactedThinkingBlockParam,
     BetaTextBlock,
     BetaTextBlockParam,
+    BetaThinkingBlock,
+    BetaThinkingBlockParam,
     BetaToolResultBlockParam,
+    BetaToolUseBlock,
+    BetaToolUseBlockParam,
 )
 
-from .tool import MacTool, ToolResult
+from .tool import READ_ONLY_ACTIONS, MacTool, ToolResult
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +40,24 @@ MODEL = "claude-opus-4-6"
 MAX_TOKENS = 16384
 THINKING_BUDGET = 8192
 MAX_ITERATIONS = 50
+CACHE_CONTROL = {"type": "ephemeral"}
+# Sliding breakpoints on user turns; with system and tools that is the API max of 4
+MESSAGE_BREAKPOINTS = 2
+ARCHIVED = "[archived]"
+PRUNED_IMAGE = "[screenshot pruned]"
+MAX_FAILURE_CHARS = 200
+# Longer tool output keeps its head and tail; the tail usually holds errors
+MAX_OUTPUT_CHARS = 8192
+CONTEXT_WINDOW = 200_000
+SUMMARY_HEADER = "Summary of earlier steps:\n"
+# Repeated compactions merge into one summary, clipped like tool output
+MAX_SUMMARY_CHARS = 8192
+# Rough per-screenshot token cost; base64 length says little about it
+IMAGE_TOKENS = 1600
+# Pruning screenshots in batches leaves the cached prefix intact in between
+IMAGE_REMOVAL_CHUNK = 5
+# Thinking, failures and old turns are rewritten only every this many exchanges
+HISTORY_CHUNK = 5
 
 _ARCH = platform.machine()
 _DATE = datetime.today().strftime("%A, %B %-d, %Y")
@@ -57,16 +86,50 @@ visibility.
 """
 
 
+@dataclass
+class ConversationState:
+    """Running bookkeeping about a conversation, so pruning can skip rescans.
+
+    Attributes
+    ----------
+    images : deque[tuple[list, int]]
+        Oldest-first references to the images held in tool results, as
+        (content list, index) pairs. Appended as results are built and
+        popped as images are pruned, so pruning never walks the history.
+    tokens : int
+        Running estimate of the prompt tokens in the first ``counted``
+        messages. New messages are added once and pruning subtracts what
+        it frees, so the compaction check never re-serializes the history.
+    counted : int
+        Number of leading messages included in ``tokens``.
+    """
+
+    images: deque[tuple[list, int]] = field(default_factory=deque)
+    tokens: int = 0
+    counted: int = 0
+
+    @property
+    def image_count(self) -> int:
+        """Upper bound on the images held in tool results."""
+        return len(self.images)
+
+    @classmethod
+    def from_messages(cls, messages: list[BetaMessageParam]) -> "ConversationState":
+        """Build a state by scanning an existing conversation once."""
+        return cls(images=deque(_image_refs(messages)))
+
+
 async def agent_loop(
     *,
     prompt: str,
-    client: Anthropic,
+    client: AsyncAnthropic,
     tool: MacTool,
     system: str = SYSTEM_PROMPT,
     model: str = MODEL,
     messages: list[BetaMessageParam] | None = None,
     max_iterations: int = MAX_ITERATIONS,
     only_n_most_recent_images: int = 3,
+    allow_parallel_tools: bool = True,
 ) -> list[BetaMessageParam]:
     """Run the agent loop until the model stops issuing tool calls.
 
@@ -74,8 +137,8 @@ async def agent_loop(
     ----------
     prompt : str
         The user's task for the agent.
-    client : Anthropic
-        Anthropic API client.
+    client : AsyncAnthropic
+        Async Anthropic API client.
     tool : MacTool
         The computer use tool executor.
     system : str
@@ -87,6 +150,10 @@ async def agent_loop(
         with prompt.
     max_iterations : int
         Safety limit on loop iterations.
+    allow_parallel_tools : bool
+        Run the leading read-only tool calls of a turn (screenshot, zoom,
+        etc.) concurrently. From the first action that changes the screen
+        on, calls run one after another in the order they were issued.
 
     Returns
     -------
@@ -95,6 +162,7 @@ async def agent_loop(
     """
     if messages is None:
         messages = [{"role": "user", "content": prompt}]
+    state = ConversationState.from_messages(messages)
 
     tool_config = {
         "type": "computer_20251124",
@@ -105,7 +173,12 @@ async def agent_loop(
         "display_height_px": tool._scaling_target.height
         if tool._scaling_target
         else tool.height,
+        "cache_control": CACHE_CONTROL,
     }
+    # Built once so every request sends identical prefix objects
+    system_blocks = [{"type": "text", "text": system, "cache_control": CACHE_CONTROL}]
+    tools = [tool_config]
+    thinking = {"thinking": {"type": "enabled", "budget_tokens": THINKING_BUDGET}}
 
     logger.info(
         "Starting agent loop: display=%dx%d, model=%s",
@@ -119,24 +192,47 @@ async def agent_loop(
     for i in range(max_iterations):
         logger.info("--- Iteration %d/%d ---", i + 1, max_iterations)
 
-        if only_n_most_recent_images:
-            _prune_images(messages, only_n_most_recent_images)
+        prune_conversation(messages, keep_images=only_n_most_recent_images, state=state)
+        set_cache_breakpoints(messages)
 
+        # Stream so text and thinking are logged as they arrive and each
+        # tool call starts as soon as its block is complete
         t0 = time.monotonic()
-        response = client.beta.messages.create(
-            model=model,
-            max_tokens=MAX_TOKENS,
-            system=[{"type": "text", "text": system}],
-            messages=messages,
-            tools=[tool_config],
-            betas=[BETA_FLAG],
-            extra_body={
-                "thinking": {
-                    "type": "enabled",
-                    "budget_tokens": THINKING_BUDGET,
-                }
-            },
-        )
+        pending: dict[str, asyncio.Task[ToolResult]] = {}
+        concurrent = allow_parallel_tools
+        try:
+            async with client.beta.messages.stream(
+                model=model,
+                max_tokens=MAX_TOKENS,
+                system=system_blocks,
+                messages=messages,
+                tools=tools,
+                betas=[BETA_FLAG],
+                extra_body=thinking,
+            ) as stream:
+                async for event in stream:
+                    if event.type != "content_block_stop":
+                        continue
+                    block = event.content_block
+                    if block.type == "thinking":
+                        logger.info("[thinking] %s", block.thinking)
+                    elif block.type == "text" and block.text:
+                        logger.info("[assistant] %s", block.text)
+                    elif block.type == "tool_use":
+                        # Once an action changes the screen, every later call
+                        # waits for all the calls before it
+                        concurrent = (
+                            concurrent
+                            and block.input.get("action") in READ_ONLY_ACTIONS
+                        )
+                        after = [] if concurrent else list(pending.values())
+                        pending[block.id] = _schedule_tool(tool, block.input, after)
+                response = await stream.get_final_message()
+        except BaseException as e:
+            await settle_tool_calls(
+                pending.values(), cancel=isinstance(e, asyncio.CancelledError)
+            )
+            raise
         api_time = time.monotonic() - t0
 
         logger.info(
@@ -147,46 +243,14 @@ async def agent_loop(
         )
 
         # Convert response to params and append as assistant message
-        assistant_content = _response_to_params(response)
+        assistant_content = response_to_params(response)
         messages.append({"role": "assistant", "content": assistant_content})
 
-        # Process tool use blocks
-        tool_results: list[BetaToolResultBlockParam] = []
-        for block in assistant_content:
-            if not isinstance(block, dict):
-                continue
-            block_type = block.get("type")
-            if block_type == "thinking":
-                thinking = block.get("thinking", "")
-                logger.info("[thinking] %s", thinking)
-            elif block_type == "text":
-                logger.info("[assistant] %s", block["text"])
-            elif block_type == "tool_use":
-                inputs = block.get("input", {})
-                action = inputs.get("action")
-                detail = _format_tool_input(inputs)
-                logger.info("[tool] %s(%s)", action, detail)
-                t0 = time.monotonic()
-                result = await tool(**inputs)
-                tool_time = time.monotonic() - t0
-                if result.error:
-                    logger.warning(
-                        "[tool] error (%.1fs): %s",
-                        tool_time,
-                        result.error,
-                    )
-                else:
-                    has_img = "screenshot" if result.base64_image else ""
-                    has_out = result.output or ""
-                    logger.info(
-                        "[tool] ok (%.1fs)%s%s",
-                        tool_time,
-                        f" output={has_out}" if has_out else "",
-                        f" [{has_img}]" if has_img else "",
-                    )
-                tool_results.append(_make_tool_result(result, block["id"]))
-
-        if not tool_results:
+        tool_blocks = [
+            block for block in assistant_content if block["type"] == "tool_use"
+        ]
+
+        if not tool_blocks:
             elapsed = time.monotonic() - loop_start
             logger.info(
                 "Done in %d iterations, %.1fs total.",
@@ -195,46 +259,185 @@ async def agent_loop(
             )
             return messages
 
+        results = await asyncio.gather(*(pending[b["id"]] for b in tool_blocks))
+
+        tool_results: list[BetaToolResultBlockParam] = [
+            make_tool_result(result, block["id"], state)
+            for result, block in zip(results, tool_blocks)
+        ]
         messages.append({"role": "user", "content": tool_results})
 
     logger.warning("Hit max iterations (%d)", max_iterations)
     return messages
 
 
-def _format_tool_input(inputs: dict) -> str:
-    """Format tool inputs for logging, omitting the action."""
-    parts = []
-    for k, v in inputs.items():
-        if k == "action":
-            continue
-        parts.append(f"{k}={v}")
-    return ", ".join(parts)
+async def settle_tool_calls(
+    tasks: Iterable[asyncio.Task[ToolResult]], *, cancel: bool = False
+) -> None:
+    """Finish tool calls started by a turn whose response never completed.
+
+    Calls start as their blocks stream in, so a stream that fails midway
+    can leave some running with no assistant message to record them
+    against. None is left running in the background: they are waited for,
+    so a half-done drag or held key completes, or cancelled when the loop
+    itself is being cancelled.
+
+    Parameters
+    ----------
+    tasks : Iterable[asyncio.Task[ToolResult]]
+        The calls started so far this turn.
+    cancel : bool
+        Cancel the calls instead of waiting for them.
+    """
+    tasks = list(tasks)
+    if not tasks:
+        return
+    logger.warning(
+        "Response failed after %d tool call(s) started; %s them",
+        len(tasks),
+        "cancelling" if cancel else "finishing",
+    )
+    if cancel:
+        for task in tasks:
+            task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _schedule_tool(
+    tool: MacTool, inputs: dict, after: list[asyncio.Task[ToolResult]]
+) -> asyncio.Task[ToolResult]:
+    """Start a tool call once every task in ``after`` has finished."""
+
+    async def run_after() -> ToolResult:
+        if after:
+            # Waited on, not awaited, so a failure there is not raised here
+            await asyncio.wait(after)
+        return await _run_tool(tool, inputs)
+
+    return asyncio.create_task(run_after())
+
+
+async def _run_tool(tool: MacTool, inputs: dict) -> ToolResult:
+    """Execute a single computer tool call and log the outcome."""
+    # Formatting inputs is wasted work when INFO is filtered out
+    log_info = logger.isEnabledFor(logging.INFO)
+    if log_info:
+        logger.info("[tool] %s(%s)", inputs.get("action"), format_tool_input(inputs))
+    t0 = time.monotonic()
+    result = await tool(**inputs)
+    tool_time = time.monotonic() - t0
+    if result.error:
+        logger.warning(
+            "[tool] error (%.1fs): %s",
+            tool_time,
+            result.error,
+        )
+    elif log_info:
+        has_img = "screenshot" if result.base64_image else ""
+        has_out = result.output or ""
+        logger.info(
+            "[tool] ok (%.1fs)%s%s",
+            tool_time,
+            f" output={has_out}" if has_out else "",
+            f" [{has_img}]" if has_img else "",
+        )
+    return result
 
 
-def _response_to_params(
+def new_event_loop() -> asyncio.AbstractEventLoop:
+    """Create a uvloop event loop if uvloop is installed, else asyncio's default.
+
+    Pass as ``asyncio.run(..., loop_factory=new_event_loop)``. uvloop is an
+    optional extra (``pip install uvloop``); the loop only uses stdlib asyncio
+    primitives, so both loops behave the same.
+    """
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.new_event_loop()
+    return uvloop.new_event_loop()
+
+
+def format_tool_input(inputs: dict, skip: tuple = ("action",)) -> str:
+    """Format tool inputs for logging, omitting the keys in ``skip``."""
+    return ", ".join(f"{k}={v}" for k, v in inputs.items() if k not in skip)
+
+
+def _text_param(block: BetaTextBlock) -> BetaTextBlockParam | None:
+    """Convert a text block, dropping it if empty."""
+    return BetaTextBlockParam(type="text", text=block.text) if block.text else None
+
+
+def _thinking_param(block: BetaThinkingBlock) -> BetaThinkingBlockParam:
+    """Convert a thinking block, keeping the signature the API verifies."""
+    return {
+        "type": "thinking",
+        "thinking": block.thinking,
+        "signature": block.signature,
+    }
+
+
+def _redacted_thinking_param(
+    block: BetaRedactedThinkingBlock,
+) -> BetaRedactedThinkingBlockParam:
+    """Convert a redacted thinking block."""
+    return {"type": "redacted_thinking", "data": block.data}
+
+
+def _tool_use_param(block: BetaToolUseBlock) -> BetaToolUseBlockParam:
+    """Convert a tool use block without a pydantic round trip."""
+    return {
+        "type": "tool_use",
+        "id": block.id,
+        "name": block.name,
+        "input": block.input,
+    }
+
+
+# Hand-built conversions for common block types; others go through model_dump.
+# Keyed by the block's type tag, since streamed messages hold subclasses
+# such as ParsedBetaTextBlock.
+_BLOCK_PARAMS = {
+    "text": _text_param,
+    "thinking": _thinking_param,
+    "redacted_thinking": _redacted_thinking_param,
+    "tool_use": _tool_use_param,
+}
+
+
+def response_to_params(
     response: BetaMessage,
 ) -> list[BetaContentBlockParam]:
     """Convert API response content blocks to params."""
     params: list[BetaContentBlockParam] = []
     for block in response.content:
-        if isinstance(block, BetaTextBlock):
-            if block.text:
-                params.append(BetaTextBlockParam(type="text", text=block.text))
-        elif getattr(block, "type", None) == "thinking":
-            params.append(
-                {
-                    "type": "thinking",
-                    "thinking": getattr(block, "thinking", None),
-                    "signature": getattr(block, "signature", None),
-                }
-            )
-        else:
-            params.append(block.model_dump())
+        to_param = _BLOCK_PARAMS.get(block.type)
+        param = to_param(block) if to_param else block.model_dump(exclude_unset=True)
+        if param is not None:
+            params.append(param)
     return params
 
 
-def _make_tool_result(result: ToolResult, tool_use_id: str) -> BetaToolResultBlockParam:
-    """Convert a ToolResult to an API tool result block."""
+def make_tool_result(
+    result: ToolResult,
+    tool_use_id: str,
+    state: ConversationState | None = None,
+    max_output_chars: int = MAX_OUTPUT_CHARS,
+) -> BetaToolResultBlockParam:
+    """Convert a ToolResult to an API tool result block.
+
+    Parameters
+    ----------
+    result : ToolResult
+        The tool's result.
+    tool_use_id : str
+        ID of the tool_use block this result answers.
+    state : ConversationState or None
+        If given, a reference to the attached screenshot is recorded.
+    max_output_chars : int
+        Text output longer than this is clipped to its first quarter and
+        last half, with a marker noting how much was cut.
+    """
     content: list[BetaTextBlockParam | BetaImageBlockParam] | str = []
     is_error = False
 
@@ -243,18 +446,22 @@ def _make_tool_result(result: ToolResult, tool_use_id: str) -> BetaToolResultBlo
         content = result.error
     else:
         if result.output:
-            content.append({"type": "text", "text": result.output})
+            content.append(
+                {"type": "text", "text": _clip_output(result.output, max_output_chars)}
+            )
         if result.base64_image:
             content.append(
                 {
                     "type": "image",
                     "source": {
                         "type": "base64",
-                        "media_type": "image/png",
+                        "media_type": result.media_type,
                         "data": result.base64_image,
                     },
                 }
             )
+            if state is not None:
+                state.images.append((content, len(content) - 1))
 
     return {
         "type": "tool_result",
@@ -264,11 +471,316 @@ def _make_tool_result(result: ToolResult, tool_use_id: str) -> BetaToolResultBlo
     }
 
 
-def _prune_images(messages: list[BetaMessageParam], images_to_keep: int) -> None:
-    """Remove all but the most recent N images from tool results.
+def _clip_output(output: str, limit: int) -> str:
+    """Keep the head and tail of output longer than ``limit`` characters."""
+    if len(output) <= limit:
+        return output
+    head, tail = limit // 4, limit // 2
+    cut = len(output) - head - tail
+    return f"{output[:head]}\n…[truncated {cut} chars]…\n{output[-tail:]}"
+
+
+def set_cache_breakpoints(
+    messages: list[BetaMessageParam],
+    count: int = MESSAGE_BREAKPOINTS,
+    start: int = 0,
+) -> None:
+    """Move the conversation cache breakpoints to the newest user turns.
+
+    The newest user turn is marked so the next request can read this
+    request's prefix from the prompt cache. The turn before it is marked
+    too, so a cache entry still matches when the newest turn was altered
+    by pruning. Older breakpoints are removed so that, together with the
+    system prompt and tool config, the request stays within the API's
+    limit of four.
+
+    Parameters
+    ----------
+    messages : list[BetaMessageParam]
+        Conversation history, modified in place.
+    count : int
+        Number of most recent user turns to mark.
+    start : int
+        Index of the first message whose breakpoints are managed. Earlier
+        messages keep whatever breakpoints the caller pinned on them.
+    """
+    managed = messages[start:]
+    for message in managed:
+        if isinstance(message["content"], list):
+            for block in message["content"]:
+                if isinstance(block, dict):
+                    block.pop("cache_control", None)
+
+    marked = 0
+    for message in reversed(managed):
+        if marked >= count:
+            break
+        if message["role"] != "user":
+            continue
+        if isinstance(message["content"], str):
+            message["content"] = [{"type": "text", "text": message["content"]}]
+        if message["content"]:
+            message["content"][-1]["cache_control"] = CACHE_CONTROL
+            marked += 1
+
+
+def prune_conversation(
+    messages: list[BetaMessageParam],
+    *,
+    keep_images: int = 3,
+    image_removal_chunk: int = IMAGE_REMOVAL_CHUNK,
+    history_chunk: int = HISTORY_CHUNK,
+    keep_thinking: int = 3,
+    keep_failures: int = 1,
+    archive_after: int = 5,
+    archive_threshold: int = 30,
+    compact_threshold: int = int(0.8 * CONTEXT_WINDOW),
+    state: ConversationState | None = None,
+) -> None:
+    """Shrink the conversation before it is resent to the API.
+
+    Runs in phases, each targeting a payload that loses value with age:
+    screenshots, thinking blocks, failed tool results, and then whole
+    turns once the history gets long. Archiving keeps tool_use blocks
+    and their tool_result counterparts, so the pairing the API requires
+    survives. If the estimated size still exceeds ``compact_threshold``,
+    older exchanges are dropped entirely and summarized into the first
+    message.
+
+    Every phase but compaction rewrites the history well before its end,
+    which invalidates the prompt cache from that point on. Images are
+    pruned in chunks, and the thinking, failure and archiving phases run
+    only once every ``history_chunk`` exchanges, so the cached prefix
+    stays byte-stable in between.
+
+    Parameters
+    ----------
+    messages : list[BetaMessageParam]
+        Conversation history, modified in place.
+    keep_images : int
+        Number of most recent screenshots to retain. 0 disables pruning.
+    image_removal_chunk : int
+        Screenshots are pruned this many at a time, so up to
+        ``keep_images + image_removal_chunk - 1`` may be kept.
+    history_chunk : int
+        Thinking blocks, failed results and old turns are pruned only when
+        the number of exchanges is a multiple of this, so up to
+        ``history_chunk - 1`` extra turns may keep them between prunes.
+    keep_thinking : int
+        Number of most recent assistant turns that keep their thinking
+        blocks. The latest turn always keeps them, as the API requires.
+    keep_failures : int
+        Number of most recent failed tool results kept verbatim. Older
+        failures are collapsed to their first line.
+    archive_after : int
+        Number of most recent assistant/user exchanges left intact when
+        archiving or compacting.
+    archive_threshold : int
+        Archive older turns once the history exceeds this many messages.
+    compact_threshold : int
+        Compact older turns once the estimated token count exceeds this.
+    state : ConversationState or None
+        Conversation bookkeeping that lets image pruning and the token
+        estimate skip their scans. Without it the conversation is scanned.
+    """
+    if state is None:
+        state = ConversationState.from_messages(messages)
+    state.tokens += _estimate_tokens(messages[state.counted :])
+    if keep_images:
+        state.tokens -= prune_images(messages, keep_images, state, image_removal_chunk)
+    if (len(messages) // 2) % history_chunk == 0:
+        state.tokens -= _prune_thinking(messages, max(keep_thinking, 1))
+        state.tokens -= _collapse_failures(messages, keep_failures)
+        if len(messages) > archive_threshold:
+            state.tokens -= _archive_turns(messages, archive_after)
+    if state.tokens > compact_threshold:
+        state.tokens -= _compact_turns(messages, archive_after)
+    state.counted = len(messages)
+
+
+def _prune_thinking(messages: list[BetaMessageParam], keep: int) -> int:
+    """Drop thinking blocks from all but the last ``keep`` assistant turns.
+
+    Thinking blocks are signed, so they are removed outright rather than
+    blanked. The API accepts earlier turns without them. Returns the
+    estimated tokens freed.
+    """
+    freed = 0
+    seen = 0
+    for message in reversed(messages):
+        if message["role"] != "assistant" or not isinstance(message["content"], list):
+            continue
+        thinking = [b for b in message["content"] if _is_thinking(b)]
+        if not thinking:
+            continue
+        seen += 1
+        if seen <= keep:
+            continue
+        remaining = [b for b in message["content"] if not _is_thinking(b)]
+        if remaining:
+            message["content"] = remaining
+            freed += _estimate_tokens(thinking)
+    return freed
+
+
+def _collapse_failures(messages: list[BetaMessageParam], keep: int) -> int:
+    """Reduce all but the last ``keep`` failed tool results to one line.
+
+    Returns the estimated tokens freed.
+    """
+    freed = 0
+    seen = 0
+    for message in reversed(messages):
+        if message["role"] != "user" or not isinstance(message["content"], list):
+            continue
+        for item in reversed(message["content"]):
+            if not (isinstance(item, dict) and item.get("type") == "tool_result"):
+                continue
+            if not item.get("is_error"):
+                continue
+            seen += 1
+            if seen > keep and isinstance(item.get("content"), str):
+                first_line = item["content"].strip().split("\n", 1)[0]
+                freed += _estimate_tokens(item["content"])
+                item["content"] = first_line[:MAX_FAILURE_CHARS]
+                freed -= _estimate_tokens(item["content"])
+    return freed
+
+
+def _archive_turns(messages: list[BetaMessageParam], keep_exchanges: int) -> int:
+    """Replace the bodies of old turns with a placeholder.
+
+    The first message (the task) and the last ``keep_exchanges``
+    assistant/user exchanges are left alone. Archived assistant turns
+    keep their tool_use blocks and archived user turns keep their
+    tool_result blocks, with the result content replaced. Returns the
+    estimated tokens freed.
+    """
+    end = len(messages) - 2 * keep_exchanges
+    freed = 0
+    for message in messages[1:end]:
+        freed += _estimate_tokens(message)
+        _archive_message(message)
+        freed -= _estimate_tokens(message)
+    return freed
+
+
+def _archive_message(message: BetaMessageParam) -> None:
+    """Replace one message's body with the archived placeholder."""
+    if not isinstance(message["content"], list):
+        message["content"] = [{"type": "text", "text": ARCHIVED}]
+        return
+    kept = []
+    for block in message["content"]:
+        if not isinstance(block, dict):
+            continue
+        if block.get("type") == "tool_use":
+            kept.append(block)
+        elif block.get("type") == "tool_result":
+            _release_result_images(block)
+            kept.append({**block, "content": ARCHIVED})
+    message["content"] = kept or [{"type": "text", "text": ARCHIVED}]
+
+
+def _compact_turns(
+    messages: list[BetaMessageParam],
+    keep_exchanges: int,
+    max_summary_chars: int = MAX_SUMMARY_CHARS,
+) -> int:
+    """Fold all but the last ``keep_exchanges`` exchanges into the task message.
+
+    The assistant text and tool calls of the dropped turns are added to a
+    plain summary at the end of the first message, so no extra model call
+    is needed. Later compactions extend the same summary, which keeps its
+    head and tail once it passes ``max_summary_chars``. The kept tail
+    starts with an assistant turn, which preserves the user/assistant
+    alternation and every tool_use/tool_result pair. Returns the
+    estimated tokens freed.
+    """
+    end = len(messages) - 2 * keep_exchanges
+    if end > 1 and messages[end]["role"] != "assistant":
+        end -= 1
+    if end <= 1:
+        return 0
+    freed = _estimate_tokens(messages[1:end])
+    lines = []
+    for message in messages[1:end]:
+        if message["role"] != "assistant" or not isinstance(message["content"], list):
+            continue
+        for block in message["content"]:
+            if not isinstance(block, dict):
+                continue
+            if block.get("type") == "text":
+                lines.append(block["text"])
+            elif block.get("type") == "tool_use":
+                detail = format_tool_input(block.get("input", {}), skip=())
+                lines.append(f"[{block.get('name')}] {detail}")
+
+    first = messages[0]
+    if isinstance(first["content"], str):
+        freed += _estimate_tokens(first["content"])
+        first["content"] = [{"type": "text", "text": first["content"]}]
+        freed -= _estimate_tokens(first["content"])
+    content = first["content"]
+    last = content[-1] if content else None
+    if isinstance(last, dict) and last.get("text", "").startswith(SUMMARY_HEADER):
+        freed += _estimate_tokens(content.pop())
+        lines.insert(0, last["text"].removeprefix(SUMMARY_HEADER))
+    text = _clip_output("\n".join(lines), max_summary_chars)
+    summary = {"type": "text", "text": SUMMARY_HEADER + text}
+    content.append(summary)
+    freed -= _estimate_tokens(summary)
+    for message in messages[1:end]:
+        if isinstance(message["content"], list):
+            for block in message["content"]:
+                if isinstance(block, dict) and block.get("type") == "tool_result":
+                    _release_result_images(block)
+    del messages[1:end]
+    return freed
+
+
+def _estimate_tokens(content: object) -> int:
+    """Roughly estimate the prompt tokens in messages or content blocks.
+
+    Text counts one token per four characters. Images count a fixed
+    IMAGE_TOKENS each.
+    """
+    if isinstance(content, str):
+        return len(content) // 4
+    if isinstance(content, list):
+        return sum(_estimate_tokens(item) for item in content)
+    if not isinstance(content, dict):
+        return 0
+    if "role" in content:
+        return _estimate_tokens(content["content"])
+    if _is_image(content):
+        return IMAGE_TOKENS
+    if content.get("type") == "tool_result":
+        return _estimate_tokens(content.get("content", []))
+    return len(json.dumps(content)) // 4
+
+
+def _is_thinking(block: object) -> bool:
+    """Check whether a content block is a (possibly redacted) thinking block."""
+    return isinstance(block, dict) and block.get("type") in (
+        "thinking",
+        "redacted_thinking",
+    )
+
+
+def prune_images(
+    messages: list[BetaMessageParam],
+    images_to_keep: int,
+    state: ConversationState | None = None,
+    min_removal_threshold: int = 1,
+) -> int:
+    """Replace all but the most recent N images in tool results.
 
     Older screenshots lose value as the screen changes. Pruning them
-    keeps the prompt size manageable and API latency low.
+    keeps the prompt size manageable and API latency low. Each pruned
+    image becomes a short text placeholder and its base64 payload is
+    released, so the memory is reclaimed without waiting on other
+    references to the block.
 
     Parameters
     ----------
@@ -276,42 +788,70 @@ def _prune_images(messages: list[BetaMessageParam], images_to_keep: int) -> None
         Conversation history, modified in place.
     images_to_keep : int
         Number of most recent images to retain.
+    state : ConversationState or None
+        If given, its image references are used instead of scanning the
+        conversation, and the oldest are popped as they are pruned.
+        Without it the conversation is scanned once, oldest first.
+    min_removal_threshold : int
+        Only prune in multiples of this many images. Every prune rewrites
+        the history from the oldest pruned image on, which invalidates the
+        prompt cache past that point; pruning in chunks keeps the cached
+        prefix stable for several turns at the cost of a few extra images.
+
+    Returns
+    -------
+    int
+        Estimated prompt tokens freed.
     """
-    # Collect all tool_result blocks that contain images
-    tool_results = [
-        item
-        for message in messages
-        for item in (message["content"] if isinstance(message["content"], list) else [])
-        if isinstance(item, dict) and item.get("type") == "tool_result"
-    ]
-
-    # Count total images
-    total = sum(
-        1
-        for tr in tool_results
-        for content in tr.get("content", [])
-        if isinstance(content, dict) and content.get("type") == "image"
-    )
+    images = state.images if state is not None else deque(_image_refs(messages))
+    excess = len(images) - images_to_keep
+    if excess <= 0:
+        return 0
+    freed = 0
+    for _ in range(excess - excess % min_removal_threshold):
+        content, index = images.popleft()
+        # Archiving or compaction may have replaced the block already
+        if _is_image(content[index]):
+            _release_image(content, index)
+            freed += IMAGE_TOKENS - _estimate_tokens(content[index])
+    return freed
+
+
+def _release_image(content: list, index: int) -> None:
+    """Swap an image for the pruned placeholder and free its payload."""
+    content[index]["source"]["data"] = ""
+    content[index] = {"type": "text", "text": PRUNED_IMAGE}
+
+
+def _release_result_images(block: dict) -> None:
+    """Release the images of a tool result that is leaving the history.
+
+    ConversationState may still reference them, and image pruning skips
+    blocks that are no longer images, so they are not counted again.
+    """
+    content = block.get("content")
+    if isinstance(content, list):
+        for index, c in enumerate(content):
+            if _is_image(c):
+                _release_image(content, index)
 
-    to_remove = total - images_to_keep
-    if to_remove <= 0:
-        return
 
-    # Walk forward (oldest first) and strip images
-    removed = 0
-    for tr in tool_results:
-        if removed >= to_remove:
-            break
-        if not isinstance(tr.get("content"), list):
+def _image_refs(messages: list[BetaMessageParam]) -> Iterator[tuple[list, int]]:
+    """Yield (content list, index) for each tool result image, oldest first."""
+    for message in messages:
+        if not isinstance(message["content"], list):
             continue
-        new_content = []
-        for content in tr["content"]:
-            if (
-                isinstance(content, dict)
-                and content.get("type") == "image"
-                and removed < to_remove
-            ):
-                removed += 1
+        for item in message["content"]:
+            if not (isinstance(item, dict) and item.get("type") == "tool_result"):
                 continue
-            new_content.append(content)
-        tr["content"] = new_content
+            content = item.get("content")
+            if not isinstance(content, list):
+                continue
+            for index, c in enumerate(content):
+                if _is_image(c):
+                    yield content, index
+
+
+def _is_image(block: object) -> bool:
+    """Check whether a content block is an image."""
+    return isinstance(block, dict) and block.get("type") == "image"
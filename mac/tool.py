@@ -8,17 +8,68 @@ environment and not intended for production use.
 
 import asyncio
 import base64
+import binascii
+import bisect
+import functools
+import inspect
 import logging
-import subprocess
 import tempfile
-from dataclasses import dataclass
+import threading
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
 from enum import Enum, StrEnum
 from io import BytesIO
 from typing import Literal
 
 import pyautogui
 from PIL import Image
-from Quartz import CGDisplayBounds, CGGetActiveDisplayList, CGMainDisplayID
+from Quartz import (
+    CFDataCreateMutable,
+    CGBitmapContextCreate,
+    CGBitmapContextCreateImage,
+    CGColorSpaceCreateDeviceRGB,
+    CGContextDrawImage,
+    CGContextSetInterpolationQuality,
+    CGDataProviderCopyData,
+    CGDisplayBounds,
+    CGDisplayCreateImage,
+    CGEventCreateMouseEvent,
+    CGEventPost,
+    CGEventSetFlags,
+    CGEventSetIntegerValueField,
+    CGGetActiveDisplayList,
+    CGImageDestinationAddImage,
+    CGImageDestinationCreateWithData,
+    CGImageDestinationFinalize,
+    CGImageGetDataProvider,
+    CGImageGetHeight,
+    CGImageGetWidth,
+    CGMainDisplayID,
+    CGRectMake,
+    CGWindowListCreateImage,
+    kCGEventFlagMaskAlternate,
+    kCGEventFlagMaskCommand,
+    kCGEventFlagMaskControl,
+    kCGEventFlagMaskSecondaryFn,
+    kCGEventFlagMaskShift,
+    kCGEventLeftMouseDown,
+    kCGEventLeftMouseUp,
+    kCGEventOtherMouseDown,
+    kCGEventOtherMouseUp,
+    kCGEventRightMouseDown,
+    kCGEventRightMouseUp,
+    kCGHIDEventTap,
+    kCGImageAlphaNoneSkipLast,
+    kCGImageDestinationLossyCompressionQuality,
+    kCGInterpolationHigh,
+    kCGMouseButtonCenter,
+    kCGMouseButtonLeft,
+    kCGMouseButtonRight,
+    kCGMouseEventClickState,
+    kCGNullWindowID,
+    kCGWindowImageNominalResolution,
+    kCGWindowListOptionOnScreenOnly,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +103,17 @@ KEY_MAP = {
     "Page_Down": "pagedown",
 }
 
+# pyautogui.KEYBOARD_KEYS is a list; a set makes validation O(1) per key
+_VALID_KEYS = frozenset(pyautogui.KEYBOARD_KEYS)
+
+# KEY_MAP extended with lowercase aliases and pyautogui's own names, so
+# most lookups hit without lowercasing the key first
+_KEY_LOOKUP = {
+    **{k: k for k in _VALID_KEYS},
+    **{k.lower(): v for k, v in KEY_MAP.items()},
+    **KEY_MAP,
+}
+
 
 class ToolError(Exception):
     """Raised when a tool action fails."""
@@ -59,7 +121,7 @@ class ToolError(Exception):
     pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ToolResult:
     """Result of a tool action.
 
@@ -70,29 +132,51 @@ class ToolResult:
     error : str or None
         Error message if the action failed.
     base64_image : str or None
-        Base64-encoded PNG screenshot.
+        Base64-encoded screenshot.
+    media_type : str
+        MIME type of base64_image.
     """
 
     output: str | None = None
     error: str | None = None
     base64_image: str | None = None
+    media_type: str = "image/png"
 
-    def with_image(self, base64_image: str | None) -> "ToolResult":
+    def with_image(
+        self, base64_image: str | None, media_type: str = "image/png"
+    ) -> "ToolResult":
         """Return a new ToolResult with the given screenshot attached."""
         return ToolResult(
-            output=self.output, error=self.error, base64_image=base64_image
+            output=self.output,
+            error=self.error,
+            base64_image=base64_image,
+            media_type=media_type,
         )
 
 
 class Action(Enum):
+    """Computer use actions.
+
+    Click actions also carry the mouse button and click count they
+    perform, as ``button`` and ``clicks``. Other actions have
+    ``button=None`` and ``clicks=0``.
+    """
+
+    def __new__(cls, value: str, button: str | None = None, clicks: int = 0):
+        member = object.__new__(cls)
+        member._value_ = value
+        member.button = button
+        member.clicks = clicks
+        return member
+
     KEY = "key"
     TYPE = "type"
     MOUSE_MOVE = "mouse_move"
-    LEFT_CLICK = "left_click"
+    LEFT_CLICK = ("left_click", "left", 1)
     LEFT_CLICK_DRAG = "left_click_drag"
-    RIGHT_CLICK = "right_click"
-    MIDDLE_CLICK = "middle_click"
-    DOUBLE_CLICK = "double_click"
+    RIGHT_CLICK = ("right_click", "right", 1)
+    MIDDLE_CLICK = ("middle_click", "middle", 1)
+    DOUBLE_CLICK = ("double_click", "left", 2)
     SCREENSHOT = "screenshot"
     CURSOR_POSITION = "cursor_position"
     LEFT_MOUSE_DOWN = "left_mouse_down"
@@ -100,14 +184,14 @@ class Action(Enum):
     SCROLL = "scroll"
     HOLD_KEY = "hold_key"
     WAIT = "wait"
-    TRIPLE_CLICK = "triple_click"
+    TRIPLE_CLICK = ("triple_click", "left", 3)
     ZOOM = "zoom"
 
 
 ScrollDirection = Literal["up", "down", "left", "right"]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ScalingTarget:
     """A target resolution to scale screenshots down to before sending to the API.
 
@@ -130,6 +214,8 @@ class ScalingTarget:
         Max height the API accepts at this aspect ratio before resizing.
     description : str
         What displays this target is intended for.
+    ratio : float
+        Aspect ratio (width / height), computed on construction.
     """
 
     name: str
@@ -138,10 +224,10 @@ class ScalingTarget:
     api_max_width: int
     api_max_height: int
     description: str
+    ratio: float = field(init=False)
 
-    @property
-    def ratio(self) -> float:
-        return self.width / self.height
+    def __post_init__(self):
+        object.__setattr__(self, "ratio", self.width / self.height)
 
 
 SCALING_TARGETS = [
@@ -154,25 +240,125 @@ SCALING_TARGETS = [
     ScalingTarget("2:1", 1280, 640, 1568, 784, "2:1 ultrawide displays"),
 ]
 
+# How close a display's aspect ratio must be to a target's to use it
+RATIO_TOLERANCE = 0.02
+
+_TARGETS_BY_RATIO = sorted(SCALING_TARGETS, key=lambda t: t.ratio)
+_TARGET_RATIOS = [t.ratio for t in _TARGETS_BY_RATIO]
+
+
+def _find_scaling_target(width: int, height: int) -> ScalingTarget | None:
+    """Find the scaling target for a display, if one applies.
+
+    Parameters
+    ----------
+    width : int
+        Display width in points.
+    height : int
+        Display height in points.
+
+    Returns
+    -------
+    ScalingTarget or None
+        The target with the nearest aspect ratio, if it is within
+        RATIO_TOLERANCE and smaller than the display. None otherwise.
+    """
+    ratio = width / height
+    i = bisect.bisect_left(_TARGET_RATIOS, ratio)
+    neighbours = _TARGETS_BY_RATIO[max(i - 1, 0) : i + 1]
+    nearest = min(neighbours, key=lambda t: abs(t.ratio - ratio))
+    if abs(nearest.ratio - ratio) < RATIO_TOLERANCE and nearest.width < width:
+        return nearest
+    return None
+
 
 class ScalingSource(StrEnum):
     COMPUTER = "computer"
     API = "API"
 
 
+# Upper bound on how long to wait for the screen to settle after an action
 SCREENSHOT_DELAY = 2.0
+# Settle detection: always wait SETTLE_MIN_WAIT, then sample a thumbnail every
+# SETTLE_INTERVAL until it is unchanged for SETTLE_STABLE seconds
+SETTLE_MIN_WAIT = 0.3
+SETTLE_INTERVAL = 0.05
+SETTLE_STABLE = 0.15
+SETTLE_THUMBNAIL_SIZE = (64, 40)
+
+# Event flags for modifier keys (pyautogui names) that can be held during a click
+MODIFIER_FLAGS = {
+    "shift": kCGEventFlagMaskShift,
+    "ctrl": kCGEventFlagMaskControl,
+    "option": kCGEventFlagMaskAlternate,
+    "alt": kCGEventFlagMaskAlternate,
+    "command": kCGEventFlagMaskCommand,
+    "fn": kCGEventFlagMaskSecondaryFn,
+}
 
-CLICK_MAP = {
-    Action.LEFT_CLICK.value: {"button": "left", "clicks": 1},
-    Action.RIGHT_CLICK.value: {"button": "right", "clicks": 1},
-    Action.MIDDLE_CLICK.value: {"button": "middle", "clicks": 1},
-    Action.DOUBLE_CLICK.value: {"button": "left", "clicks": 2},
-    Action.TRIPLE_CLICK.value: {"button": "left", "clicks": 3},
+# (down event, up event, CGMouseButton) for each button
+_MOUSE_EVENTS = {
+    "left": (kCGEventLeftMouseDown, kCGEventLeftMouseUp, kCGMouseButtonLeft),
+    "right": (kCGEventRightMouseDown, kCGEventRightMouseUp, kCGMouseButtonRight),
+    "middle": (kCGEventOtherMouseDown, kCGEventOtherMouseUp, kCGMouseButtonCenter),
 }
 
 
+def _post_click(x: float, y: float, button: str, clicks: int, flags: int = 0) -> None:
+    """Post a click straight to the HID event tap.
+
+    Unlike pyautogui.click, this does not sleep pyautogui.PAUSE, and
+    modifiers travel as event flags instead of separate key presses.
+
+    Parameters
+    ----------
+    x, y : float
+        Screen position in points.
+    button : str
+        "left", "right" or "middle".
+    clicks : int
+        Number of clicks. Each pair of events carries an increasing click
+        state, so the system recognizes double and triple clicks.
+    flags : int
+        Modifier flags (see MODIFIER_FLAGS) to set on every event.
+    """
+    down, up, cg_button = _MOUSE_EVENTS[button]
+    for click_state in range(1, clicks + 1):
+        for event_type in (down, up):
+            event = CGEventCreateMouseEvent(None, event_type, (x, y), cg_button)
+            CGEventSetIntegerValueField(event, kCGMouseEventClickState, click_state)
+            if flags:
+                CGEventSetFlags(event, flags)
+            CGEventPost(kCGHIDEventTap, event)
+
+
+# Actions that only observe the screen, so they can run concurrently. WAIT
+# is left out: the model waits so that later observations see a settled screen.
+READ_ONLY_ACTIONS = frozenset(
+    {
+        Action.SCREENSHOT.value,
+        Action.CURSOR_POSITION.value,
+        Action.ZOOM.value,
+    }
+)
+
+
+def _b64encode(data: bytes) -> str:
+    """Base64-encode image bytes to an ASCII string."""
+    # b2a_base64 skips b64encode's wrapper; ASCII decoding is the cheapest
+    return binascii.b2a_base64(data, newline=False).decode("ascii")
+
+
+ImageFormat = Literal["png", "jpeg"]
+
+# JPEG quality for screenshots; text stays legible and payloads shrink ~5-10x
+JPEG_QUALITY = 80
+
+
 class MacTool:
-    def __init__(self, display: int | None = None):
+    def __init__(self, display: int | None = None, image_format: ImageFormat = "jpeg"):
+        if image_format not in ("png", "jpeg"):
+            raise ValueError(f"unsupported image format: {image_format}")
         if display is not None:
             err, display_ids, count = CGGetActiveDisplayList(10, None, None)
             if display < 1 or display > count:
@@ -182,17 +368,17 @@ class MacTool:
             display_id = CGMainDisplayID()
 
         self._display = display
+        self._display_id = display_id
+        self._image_format = image_format
+        self._media_type = f"image/{image_format}"
+        self._contexts: dict[tuple[int, int], object] = {}
+        self._context_lock = threading.Lock()
         bounds = CGDisplayBounds(display_id)
+        self._bounds = bounds
         self.width = int(bounds.size.width)
         self.height = int(bounds.size.height)
 
-        ratio = self.width / self.height
-        self._scaling_target: ScalingTarget | None = None
-        for target in SCALING_TARGETS:
-            if abs(target.ratio - ratio) < 0.02:
-                if target.width < self.width:
-                    self._scaling_target = target
-                break
+        self._scaling_target = _find_scaling_target(self.width, self.height)
 
         if self._scaling_target is None:
             logger.warning(
@@ -202,58 +388,76 @@ class MacTool:
                 "performance. Add a ScalingTarget for this display.",
                 self.width,
                 self.height,
-                ratio,
+                self.width / self.height,
             )
 
-    async def __call__(
-        self,
-        action: str,
-        text: str | None = None,
-        start_coordinate: tuple[int, int] | None = None,
-        coordinate: tuple[int, int] | None = None,
-        key: str | None = None,
-        scroll_direction: ScrollDirection | None = None,
-        scroll_amount: int | None = None,
-        duration: int | float | None = None,
-        region: tuple[int, int, int, int] | None = None,
-        **kwargs,
-    ):
-
-        if action == Action.SCREENSHOT.value:
-            return await self.screenshot()
-        elif action == Action.KEY.value:
-            return await self.key(text)
-        elif action == Action.TYPE.value:
-            return await self.type(text)
-        elif action == Action.MOUSE_MOVE.value:
-            return await self.mouse_move(text, coordinate)
-        elif action in (
-            Action.LEFT_CLICK.value,
-            Action.RIGHT_CLICK.value,
-            Action.MIDDLE_CLICK.value,
-            Action.DOUBLE_CLICK.value,
-            Action.TRIPLE_CLICK.value,
-        ):
-            return await self.click(action, text, coordinate, key)
-        elif action == Action.LEFT_CLICK_DRAG.value:
-            return await self.left_click_drag(text, start_coordinate, coordinate, key)
-        elif action == Action.CURSOR_POSITION.value:
-            return await self.cursor_position()
-        elif action in (
-            Action.LEFT_MOUSE_DOWN.value,
-            Action.LEFT_MOUSE_UP.value,
-        ):
-            return await self.mouse_button(action)
-        elif action == Action.SCROLL.value:
-            return await self.scroll(coordinate, scroll_direction, scroll_amount, text)
-        elif action == Action.HOLD_KEY.value:
-            return await self.hold_key(text, duration)
-        elif action == Action.WAIT.value:
-            return await self.wait(duration)
-        elif action == Action.ZOOM.value:
-            return await self.zoom(region)
+        handlers: dict[Action, Callable[..., Awaitable[ToolResult]]] = {
+            Action.SCREENSHOT: self.screenshot,
+            Action.KEY: self.key,
+            Action.TYPE: self.type,
+            Action.MOUSE_MOVE: self.mouse_move,
+            Action.LEFT_CLICK: self.click,
+            Action.RIGHT_CLICK: self.click,
+            Action.MIDDLE_CLICK: self.click,
+            Action.DOUBLE_CLICK: self.click,
+            Action.TRIPLE_CLICK: self.click,
+            Action.LEFT_CLICK_DRAG: self.left_click_drag,
+            Action.CURSOR_POSITION: self.cursor_position,
+            Action.LEFT_MOUSE_DOWN: self.mouse_button,
+            Action.LEFT_MOUSE_UP: self.mouse_button,
+            Action.SCROLL: self.scroll,
+            Action.HOLD_KEY: self.hold_key,
+            Action.WAIT: self.wait,
+            Action.ZOOM: self.zoom,
+        }
+        # Each handler is paired with the parameter names it accepts, so
+        # dispatch can drop inputs that belong to other actions.
+        self._dispatch = {
+            action.value: (handler, frozenset(inspect.signature(handler).parameters))
+            for action, handler in handlers.items()
+        }
+
+    @property
+    def _scaling_target(self) -> ScalingTarget | None:
+        """Resolution screenshots are scaled to, or None for full size."""
+        return self._target
+
+    @_scaling_target.setter
+    def _scaling_target(self, target: ScalingTarget | None) -> None:
+        # Coordinates are scaled on every pointer action, so the API-space
+        # bounds and scale factors are cached whenever the target changes.
+        self._target = target
+        if target is None:
+            self._api_width, self._api_height = self.width, self.height
         else:
+            self._api_width, self._api_height = target.width, target.height
+        self._x_to_screen = self.width / self._api_width
+        self._y_to_screen = self.height / self._api_height
+        self._x_to_api = self._api_width / self.width
+        self._y_to_api = self._api_height / self.height
+
+    async def __call__(self, action: str, **kwargs) -> ToolResult:
+        """Run a computer use action.
+
+        Parameters
+        ----------
+        action : str
+            Action name from the computer use tool schema.
+        **kwargs
+            Action inputs (text, coordinate, key, etc.). Inputs the
+            action's handler does not accept are ignored.
+
+        Returns
+        -------
+        ToolResult
+            Result of the action, or an error for an unknown action.
+        """
+        entry = self._dispatch.get(action)
+        if entry is None:
             return ToolResult(error=f"unknown action: {action}")
+        handler, params = entry
+        kwargs["action"] = action
+        return await handler(**{k: v for k, v in kwargs.items() if k in params})
 
     async def zoom(self, region: tuple[int, int, int, int] | None = None) -> ToolResult:
         """Zoom into a region of the screen by cropping a screenshot.
@@ -275,18 +479,23 @@ class MacTool:
         if not all(isinstance(c, int) and c >= 0 for c in region):
             return ToolResult(error="region must contain non-negative integers")
         try:
-            x0, y0 = self.scale_coordinates(ScalingSource.API, region[0], region[1])
-            x1, y1 = self.scale_coordinates(ScalingSource.API, region[2], region[3])
+            (x0, y0), (x1, y1) = self._scale_api_to_screen(
+                ((region[0], region[1]), (region[2], region[3]))
+            )
         except ToolError as e:
             return ToolResult(error=str(e))
         screenshot = await self.screenshot()
         if not screenshot.base64_image:
             return ToolResult(error="failed to take screenshot for zoom")
-        img = Image.open(BytesIO(base64.b64decode(screenshot.base64_image)))
-        cropped = img.crop((x0, y0, x1, y1))
-        buf = BytesIO()
-        cropped.save(buf, format="PNG")
-        return ToolResult(base64_image=base64.b64encode(buf.getvalue()).decode())
+        data = await asyncio.to_thread(
+            self._crop, screenshot.base64_image, (x0, y0, x1, y1)
+        )
+        return ToolResult(base64_image=_b64encode(data), media_type=self._media_type)
+
+    def _crop(self, base64_image: str, box: tuple[int, int, int, int]) -> bytes:
+        """Decode a screenshot, crop it to ``box`` and re-encode it."""
+        img = Image.open(BytesIO(base64.b64decode(base64_image)))
+        return self._encode(img.crop(box))
 
     async def hold_key(
         self,
@@ -314,9 +523,9 @@ class MacTool:
         if duration > 100:
             return ToolResult(error="duration is too long")
         key = self._map_key(text)
-        pyautogui.keyDown(key)
+        await asyncio.to_thread(pyautogui.keyDown, key)
         await asyncio.sleep(duration)
-        pyautogui.keyUp(key)
+        await asyncio.to_thread(pyautogui.keyUp, key)
         return await self._result_with_screenshot(ToolResult())
 
     async def wait(self, duration: int | float | None = None) -> ToolResult:
@@ -385,15 +594,15 @@ class MacTool:
             move_kwargs = {"x": x, "y": y}
         modifier = self._map_key(text) if text else None
         if modifier:
-            pyautogui.keyDown(modifier)
+            await asyncio.to_thread(pyautogui.keyDown, modifier)
         if scroll_direction in ("up", "down"):
             clicks = scroll_amount if scroll_direction == "up" else -scroll_amount
-            pyautogui.scroll(clicks, **move_kwargs)
+            await asyncio.to_thread(pyautogui.scroll, clicks, **move_kwargs)
         else:
             clicks = scroll_amount if scroll_direction == "right" else -scroll_amount
-            pyautogui.hscroll(clicks, **move_kwargs)
+            await asyncio.to_thread(pyautogui.hscroll, clicks, **move_kwargs)
         if modifier:
-            pyautogui.keyUp(modifier)
+            await asyncio.to_thread(pyautogui.keyUp, modifier)
         return await self._result_with_screenshot(ToolResult())
 
     async def mouse_button(self, action: str) -> ToolResult:
@@ -410,9 +619,9 @@ class MacTool:
             Empty output on success.
         """
         if action == Action.LEFT_MOUSE_DOWN.value:
-            pyautogui.mouseDown(button="left")
+            await asyncio.to_thread(pyautogui.mouseDown, button="left")
         else:
-            pyautogui.mouseUp(button="left")
+            await asyncio.to_thread(pyautogui.mouseUp, button="left")
         return await self._result_with_screenshot(ToolResult())
 
     async def cursor_position(self) -> ToolResult:
@@ -423,39 +632,159 @@ class MacTool:
         ToolResult
             Output string with X=<x>,Y=<y> in API-scaled coordinates.
         """
-        pos = pyautogui.position()
+        pos = await asyncio.to_thread(pyautogui.position)
         x, y = self.scale_coordinates(ScalingSource.COMPUTER, pos.x, pos.y)
         return ToolResult(output=f"X={x},Y={y}")
 
     async def screenshot(self) -> ToolResult:
-        """Capture the screen and return a scaled, base64-encoded PNG.
+        """Capture the screen and return a scaled, base64-encoded image.
+
+        The image is encoded in the tool's ``image_format``.
 
         Returns
         -------
         ToolResult
             Contains base64_image on success, error on failure.
         """
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=True) as tmp:
-            tmp_path = tmp.name
-            cmd = ["screencapture", "-x"]
-            if self._display is not None:
-                cmd += ["-D", str(self._display)]
-            cmd.append(tmp_path)
-            result = subprocess.run(cmd, capture_output=True)
-            if result.returncode != 0:
-                return ToolResult(
-                    error=f"screencapture failed: {result.stderr.decode()}"
+        # CoreGraphics and PIL work is blocking, so it runs in a worker
+        # thread to keep the event loop free for concurrent tool calls.
+        data = await asyncio.to_thread(self._capture_native)
+        if data is None:
+            # Fall back to screencapture. It can only write to a file, so the
+            # capture makes one trip through disk; decoding, resizing and
+            # encoding stay in memory. Capturing straight to the transport
+            # format means an unscaled capture needs no re-encode.
+            fmt = "jpg" if self._image_format == "jpeg" else "png"
+            with tempfile.NamedTemporaryFile(suffix=f".{fmt}", delete=True) as tmp:
+                cmd = ["screencapture", "-x", "-t", fmt]
+                if self._display is not None:
+                    cmd += ["-D", str(self._display)]
+                cmd.append(tmp.name)
+                proc = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.PIPE,
                 )
-            if self._scaling_target:
-                img = Image.open(tmp_path)
-                img = img.resize(
-                    (self._scaling_target.width, self._scaling_target.height),
-                    Image.LANCZOS,
-                )
-                img.save(tmp_path, "PNG")
-            return ToolResult(
-                base64_image=base64.b64encode(open(tmp_path, "rb").read()).decode()
+                _, stderr = await proc.communicate()
+                if proc.returncode != 0:
+                    return ToolResult(error=f"screencapture failed: {stderr.decode()}")
+                with open(tmp.name, "rb") as f:
+                    data = f.read()
+            data = await asyncio.to_thread(self._rescale, data)
+        return ToolResult(
+            base64_image=_b64encode(data),
+            media_type=self._media_type,
+        )
+
+    def _rescale(self, data: bytes) -> bytes:
+        """Resize a full-resolution capture and encode it for transport.
+
+        The capture must already be in the tool's image format.
+        """
+        if not self._scaling_target:
+            return data
+        size = (self._scaling_target.width, self._scaling_target.height)
+        img = Image.open(BytesIO(data))
+        # libjpeg can decode at 1/2, 1/4 or 1/8 scale while staying above
+        # the target size; other formats ignore the draft request.
+        img.draft("RGB", size)
+        # Box-reduce by the integer scale factor first so LANCZOS filters
+        # a fraction of the retina pixels.
+        img = img.resize(size, Image.LANCZOS, reducing_gap=1.0)
+        return self._encode(img)
+
+    def _capture_native(self) -> bytes | None:
+        """Capture, scale and encode the display with CoreGraphics.
+
+        Scaling happens in a bitmap context at the target size, which is
+        much faster than a PIL resize of the full retina capture.
+
+        Returns
+        -------
+        bytes or None
+            Encoded image, or None if the display could not be captured
+            (e.g. Screen Recording permission was not granted).
+        """
+        image = self._capture_display(nominal=self._scaling_target is not None)
+        if image is None:
+            return None
+        if self._scaling_target:
+            width, height = self._scaling_target.width, self._scaling_target.height
+        else:
+            width, height = CGImageGetWidth(image), CGImageGetHeight(image)
+
+        # The context's pixel buffer is reused across screenshots; the lock
+        # keeps concurrent captures from drawing into it at the same time.
+        with self._context_lock:
+            context = self._bitmap_context(width, height)
+            CGContextDrawImage(context, CGRectMake(0, 0, width, height), image)
+            scaled = CGBitmapContextCreateImage(context)
+
+        data = CFDataCreateMutable(None, 0)
+        uti = "public.jpeg" if self._image_format == "jpeg" else "public.png"
+        destination = CGImageDestinationCreateWithData(data, uti, 1, None)
+        properties = None
+        if self._image_format == "jpeg":
+            properties = {
+                kCGImageDestinationLossyCompressionQuality: JPEG_QUALITY / 100
+            }
+        CGImageDestinationAddImage(destination, scaled, properties)
+        if not CGImageDestinationFinalize(destination):
+            return None
+        return bytes(data)
+
+    def _capture_display(self, nominal: bool):
+        """Capture the display as a CGImage.
+
+        Parameters
+        ----------
+        nominal : bool
+            Capture at the display's point size rather than its backing
+            pixel size. On a Retina display this is a quarter of the
+            pixels, and it is all a downscaled screenshot needs, since
+            every scaling target is smaller than the point size.
+
+        Returns
+        -------
+        CGImage or None
+            The capture, or None if the display could not be captured.
+        """
+        if nominal:
+            return CGWindowListCreateImage(
+                self._bounds,
+                kCGWindowListOptionOnScreenOnly,
+                kCGNullWindowID,
+                kCGWindowImageNominalResolution,
             )
+        return CGDisplayCreateImage(self._display_id)
+
+    def _bitmap_context(self, width: int, height: int):
+        """Return the cached bitmap context for a size, creating it if needed."""
+        context = self._contexts.get((width, height))
+        if context is None:
+            context = CGBitmapContextCreate(
+                None,
+                width,
+                height,
+                8,
+                0,
+                CGColorSpaceCreateDeviceRGB(),
+                kCGImageAlphaNoneSkipLast,
+            )
+            CGContextSetInterpolationQuality(context, kCGInterpolationHigh)
+            self._contexts[(width, height)] = context
+        return context
+
+    def _encode(self, img: Image.Image) -> bytes:
+        """Encode an image in the tool's transport format."""
+        buf = BytesIO()
+        if self._image_format == "jpeg":
+            # JPEG has no alpha channel
+            img.convert("RGB").save(buf, "JPEG", quality=JPEG_QUALITY)
+        else:
+            # Fast zlib level: screenshots compress nearly as well at 1 as at 6
+            img.save(buf, "PNG", compress_level=1)
+        return buf.getvalue()
 
     async def _result_with_screenshot(
         self, result: ToolResult, take_screenshot: bool = True
@@ -471,13 +800,71 @@ class MacTool:
         """
         if not take_screenshot:
             return result
-        await asyncio.sleep(SCREENSHOT_DELAY)
+        await self._wait_for_settle()
         screenshot = await self.screenshot()
-        return result.with_image(screenshot.base64_image)
+        return result.with_image(screenshot.base64_image, screenshot.media_type)
+
+    async def _wait_for_settle(self) -> None:
+        """Wait until the screen stops changing, up to SCREENSHOT_DELAY.
+
+        After a short minimum wait, which gives the UI time to start
+        reacting to the action, a small thumbnail of the display is
+        sampled every SETTLE_INTERVAL seconds. The wait ends once the
+        thumbnail has been unchanged for SETTLE_STABLE seconds. If the
+        display cannot be sampled, the full delay is slept.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + SCREENSHOT_DELAY
+        await asyncio.sleep(min(SETTLE_MIN_WAIT, SCREENSHOT_DELAY))
+        previous, stable_since = None, None
+        while (remaining := deadline - loop.time()) > 0:
+            thumbnail = await asyncio.to_thread(self._thumbnail)
+            if thumbnail is None:
+                await asyncio.sleep(remaining)
+                return
+            now = loop.time()
+            if thumbnail != previous:
+                previous, stable_since = thumbnail, now
+            elif now - stable_since >= SETTLE_STABLE:
+                return
+            await asyncio.sleep(min(SETTLE_INTERVAL, remaining))
+
+    def _thumbnail(self) -> bytes | None:
+        """Capture the display as raw pixels of a tiny thumbnail.
 
-    def _map_key(self, key: str) -> str:
+        Returns
+        -------
+        bytes or None
+            Pixel data, or None if the display could not be captured.
+        """
+        image = self._capture_display(nominal=True)
+        if image is None:
+            return None
+        width, height = SETTLE_THUMBNAIL_SIZE
+        with self._context_lock:
+            context = self._bitmap_context(width, height)
+            CGContextDrawImage(context, CGRectMake(0, 0, width, height), image)
+            thumbnail = CGBitmapContextCreateImage(context)
+        return bytes(CGDataProviderCopyData(CGImageGetDataProvider(thumbnail)))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _map_key(key: str) -> str:
         """Map an X11 key name to a pyautogui key name."""
-        return KEY_MAP.get(key, key.lower())
+        return _KEY_LOOKUP.get(key) or key.lower()
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _parse_combo(text: str) -> tuple[tuple[str, ...], tuple[str, ...]]:
+        """Split a key combo into pyautogui key names.
+
+        Returns
+        -------
+        tuple[tuple[str, ...], tuple[str, ...]]
+            The mapped keys, and those among them pyautogui does not know.
+        """
+        keys = tuple(MacTool._map_key(k) for k in text.split("+"))
+        return keys, tuple(k for k in keys if k not in _VALID_KEYS)
 
     async def key(self, text: str | None = None) -> ToolResult:
         """Press a key or key combination.
@@ -494,14 +881,13 @@ class MacTool:
         """
         if text is None:
             return ToolResult(error="text is required for key")
-        keys = [self._map_key(k) for k in text.split("+")]
-        invalid = [k for k in keys if k not in pyautogui.KEYBOARD_KEYS]
+        keys, invalid = self._parse_combo(text)
         if invalid:
             return ToolResult(error=f"unrecognized key(s): {', '.join(invalid)}")
         if len(keys) == 1:
-            pyautogui.press(keys[0])
+            await asyncio.to_thread(pyautogui.press, keys[0])
         else:
-            pyautogui.hotkey(*keys)
+            await asyncio.to_thread(pyautogui.hotkey, *keys)
         return await self._result_with_screenshot(ToolResult())
 
     async def type(self, text: str | None = None) -> ToolResult:
@@ -519,7 +905,7 @@ class MacTool:
         """
         if text is None:
             return ToolResult(error="text is required for type")
-        pyautogui.write(text, interval=0.012)
+        await asyncio.to_thread(pyautogui.write, text, interval=0.012)
         return await self._result_with_screenshot(ToolResult())
 
     async def mouse_move(
@@ -536,7 +922,7 @@ class MacTool:
             )
         except ToolError as e:
             return ToolResult(error=str(e))
-        pyautogui.moveTo(x, y)
+        await asyncio.to_thread(pyautogui.moveTo, x, y)
         return await self._result_with_screenshot(ToolResult())
 
     def scale_coordinates(
@@ -568,23 +954,42 @@ class MacTool:
         regardless of the resampling filter used.
         """
         if source == ScalingSource.API:
-            max_x = self._scaling_target.width if self._scaling_target else self.width
-            max_y = self._scaling_target.height if self._scaling_target else self.height
-            if x < 0 or y < 0 or x > max_x or y > max_y:
-                raise ToolError(
-                    f"Coordinates ({x}, {y}) are out of bounds (max {max_x}x{max_y})"
-                )
+            return self._scale_api_to_screen(((x, y),))[0]
 
-        if self._scaling_target is None:
+        if self._target is None:
             return x, y
+        return round(x * self._x_to_api), round(y * self._y_to_api)
 
-        x_scale = self._scaling_target.width / self.width
-        y_scale = self._scaling_target.height / self.height
+    def _scale_api_to_screen(
+        self, points: tuple[tuple[int, int], ...]
+    ) -> list[tuple[int, int]]:
+        """Bounds-check API coordinates and scale them to the screen in one pass.
 
-        if source == ScalingSource.API:
-            return round(x / x_scale), round(y / y_scale)
-        else:
-            return round(x * x_scale), round(y * y_scale)
+        Parameters
+        ----------
+        points : tuple[tuple[int, int], ...]
+            (x, y) pairs in API space.
+
+        Returns
+        -------
+        list[tuple[int, int]]
+            The pairs in screen space.
+
+        Raises
+        ------
+        ToolError
+            If any pair lies outside the API-space display.
+        """
+        width, height = self._api_width, self._api_height
+        for x, y in points:
+            if x < 0 or y < 0 or x > width or y > height:
+                raise ToolError(
+                    f"Coordinates ({x}, {y}) are out of bounds (max {width}x{height})"
+                )
+        if self._target is None:
+            return [(x, y) for x, y in points]
+        sx, sy = self._x_to_screen, self._y_to_screen
+        return [(round(x * sx), round(y * sy)) for x, y in points]
 
     async def click(
         self,
@@ -616,14 +1021,19 @@ class MacTool:
                 )
             except ToolError as e:
                 return ToolResult(error=str(e))
-            pyautogui.moveTo(x, y)
+            await asyncio.to_thread(pyautogui.moveTo, x, y)
+        else:
+            x, y = await asyncio.to_thread(pyautogui.position)
         modifier = self._map_key(key) if key else None
-        if modifier:
-            pyautogui.keyDown(modifier)
-        click_kwargs = CLICK_MAP[action]
-        pyautogui.click(**click_kwargs)
-        if modifier:
-            pyautogui.keyUp(modifier)
+        flags = MODIFIER_FLAGS.get(modifier, 0) if modifier else 0
+        # Keys that are not modifiers cannot be sent as event flags
+        held = modifier if modifier and not flags else None
+        if held:
+            await asyncio.to_thread(pyautogui.keyDown, held)
+        click = Action(action)
+        await asyncio.to_thread(_post_click, x, y, click.button, click.clicks, flags)
+        if held:
+            await asyncio.to_thread(pyautogui.keyUp, held)
         return await self._result_with_screenshot(ToolResult())
 
     async def left_click_drag(
@@ -653,21 +1063,18 @@ class MacTool:
         if coordinate is None:
             return ToolResult(error="coordinate is required for left_click_drag")
         try:
-            start_x, start_y = self.scale_coordinates(
-                ScalingSource.API, start_coordinate[0], start_coordinate[1]
-            )
-            end_x, end_y = self.scale_coordinates(
-                ScalingSource.API, coordinate[0], coordinate[1]
+            (start_x, start_y), (end_x, end_y) = self._scale_api_to_screen(
+                (tuple(start_coordinate), tuple(coordinate))
             )
         except ToolError as e:
             return ToolResult(error=str(e))
         modifier = self._map_key(key) if key else None
         if modifier:
-            pyautogui.keyDown(modifier)
-        pyautogui.moveTo(start_x, start_y)
-        pyautogui.mouseDown(button="left")
-        pyautogui.moveTo(end_x, end_y)
-        pyautogui.mouseUp(button="left")
+            await asyncio.to_thread(pyautogui.keyDown, modifier)
+        await asyncio.to_thread(pyautogui.moveTo, start_x, start_y)
+        await asyncio.to_thread(pyautogui.mouseDown, button="left")
+        await asyncio.to_thread(pyautogui.moveTo, end_x, end_y)
+        await asyncio.to_thread(pyautogui.mouseUp, button="left")
         if modifier:
-            pyautogui.keyUp(modifier)
+            await asyncio.to_thread(pyautogui.keyUp, modifier)
         return await self._result_with_screenshot(ToolResult())
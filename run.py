@@ -3,16 +3,16 @@
 import argparse
 import asyncio
 import logging
-from datetime import datetime
-from pathlib import Path
+import os
+import time
 
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
 from dotenv import load_dotenv
 
-from mac.loop import agent_loop
+from mac.loop import agent_loop, new_event_loop
 from mac.tool import MacTool
 
-LOG_DIR = Path("logs")
+LOG_DIR = "logs"
 
 
 async def main():
@@ -30,11 +30,16 @@ async def main():
         default=None,
         help="Display number (1-indexed)",
     )
+    parser.add_argument(
+        "--png",
+        action="store_true",
+        help="Send lossless PNG screenshots instead of JPEG (for debugging)",
+    )
     args = parser.parse_args()
 
-    LOG_DIR.mkdir(exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_file = LOG_DIR / f"run_{timestamp}.log"
+    os.makedirs(LOG_DIR, exist_ok=True)
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    log_file = os.path.join(LOG_DIR, f"run_{timestamp}.log")
 
     fmt = "%(asctime)s %(name)s %(levelname)s %(message)s"
     datefmt = "%H:%M:%S"
@@ -47,10 +52,10 @@ async def main():
 
     logging.getLogger(__name__).info("Logging to %s", log_file)
 
-    client = Anthropic()
-    tool = MacTool(display=args.display)
+    client = AsyncAnthropic()
+    tool = MacTool(display=args.display, image_format="png" if args.png else "jpeg")
     await agent_loop(prompt=args.prompt, client=client, tool=tool)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(main(), loop_factory=new_event_loop)
@@ -1,35 +1,38 @@
 """Shopping agent: multi-tool agent loop with computer use, bash, and text editor.
 
 Adapted from mac/loop.py to dispatch tool calls to the appropriate runner
-based on tool name.
+based on tool name. Message conversion and pruning helpers are shared with
+mac/loop.py.
 """
 
+from __future__ import annotations
+
 import asyncio
+import functools
 import logging
 import platform
 import time
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-
-from anthropic import Anthropic
-from anthropic.types.beta import (
-    BetaContentBlockParam,
-    BetaImageBlockParam,
-    BetaMessage,
-    BetaMessageParam,
-    BetaTextBlock,
-    BetaTextBlockParam,
-    BetaToolResultBlockParam,
-)
-from dotenv import load_dotenv
-
-from mac.tool import MacTool, ToolResult
+from typing import TYPE_CHECKING
 
 from .prompt import build_freeform_prompt, build_task_prompt
 from .tools.bash import BashSession
 from .tools.text_editor import TextEditor
 
+# The SDK, dotenv and the Quartz-backed tool are imported where they are
+# used, so --dry-run only pays for building the prompt
+if TYPE_CHECKING:
+    from anthropic import AsyncAnthropic
+    from anthropic.types.beta import (
+        BetaMessage,
+        BetaMessageParam,
+        BetaToolResultBlockParam,
+    )
+
+    from mac.tool import MacTool, ToolResult
+
 logger = logging.getLogger(__name__)
 
 BETA_FLAG = "computer-use-2025-11-24"
@@ -37,10 +40,11 @@ MODEL = "claude-opus-4-6"
 MAX_TOKENS = 16384
 THINKING_BUDGET = 8192
 MAX_ITERATIONS = 50
+MAX_HISTORY_TURNS = 20
 
 _ARCH = platform.machine()
-_DATE = datetime.today().strftime("%A, %B %-d, %Y")
-_CWD = Path.cwd()
+_DATE_FORMAT = "%A, %B %-d, %Y"
+_CWD = Path.cwd().resolve()
 
 # Opus pricing per token (as of Feb 2026)
 COST_PER_INPUT_TOKEN = 5.0 / 1_000_000
@@ -96,17 +100,31 @@ class UsageTracker:
             + self.cache_read_input_tokens * COST_PER_INPUT_TOKEN * 0.1
         )
 
+    @property
+    def cache_hit_rate(self) -> float:
+        """Fraction of input tokens read from the prompt cache."""
+        total = self.total_input_tokens
+        return self.cache_read_input_tokens / total if total else 0.0
+
+    @property
+    def cache_savings_usd(self) -> float:
+        """USD saved by cache reads versus paying full input price."""
+        return self.cache_read_input_tokens * COST_PER_INPUT_TOKEN * 0.9
+
     def step_summary(
         self, iteration: int, max_iterations: int, step_cost: float, api_time: float
     ) -> str:
         """One-line summary for the current iteration."""
-        return (
+        summary = (
             f"[step {iteration}/{max_iterations}] "
             f"step=${step_cost:.4f} "
             f"cumulative=${self.cost:.4f} "
             f"api={api_time:.1f}s "
             f"cumulative_api={self.api_seconds:.1f}s"
         )
+        if self.cache_read_input_tokens:
+            summary += f" cache_hit={self.cache_hit_rate:.0%}"
+        return summary
 
     @property
     def total_input_tokens(self) -> int:
@@ -127,6 +145,8 @@ class UsageTracker:
             f"(uncached={self.input_tokens:,} "
             f"cache_write={self.cache_creation_input_tokens:,} "
             f"cache_read={self.cache_read_input_tokens:,})",
+            f"Cache hit:     {self.cache_hit_rate:.1%} "
+            f"(saved ${self.cache_savings_usd:.4f})",
             f"Output tokens: {self.output_tokens:,}",
             f"API time:      {self.api_seconds:.1f}s",
             f"Wall time:     {self.wall_seconds:.1f}s",
@@ -136,6 +156,13 @@ class UsageTracker:
 
 
 def _build_system_prompt(cwd: Path) -> str:
+    """Return the system prompt for ``cwd``, dated today."""
+    return _system_prompt(cwd, datetime.today().strftime(_DATE_FORMAT))
+
+
+# Keyed on the date too, so a process running past midnight rebuilds it
+@functools.lru_cache(maxsize=8)
+def _system_prompt(cwd: Path, date: str) -> str:
     return f"""\
 <SYSTEM_CAPABILITY>
 * You are utilising a macOS machine using {_ARCH} \
@@ -146,7 +173,7 @@ keyboard, and screenshot tools.
 * You have a text editor tool for reading and writing files.
 * Your working directory is {cwd}. Use relative paths \
 for all file operations.
-* The current date is {_DATE}.
+* The current date is {date}.
 * To open applications, use Spotlight: key combo \
 "super+space", then type the app name and press Return.
 * The default browser is Safari. You can type URLs \
@@ -169,18 +196,22 @@ visibility.
 
 async def run(
     *,
-    prompt: str,
+    prompt: str | list[dict],
     display: int | None = None,
     model: str = MODEL,
     max_iterations: int = MAX_ITERATIONS,
     only_n_most_recent_images: int = 3,
+    max_history_turns: int = MAX_HISTORY_TURNS,
+    client: AsyncAnthropic | None = None,
 ) -> list[BetaMessageParam]:
     """Run the shopping agent with all tools.
 
     Parameters
     ----------
-    prompt : str
-        The task for the agent.
+    prompt : str or list[dict]
+        The task for the agent, as a string or as text blocks. With
+        blocks, the first is taken to be a prefix shared across runs
+        (such as the shopping brief) and gets its own cache breakpoint.
     display : int or None
         Display number for MacTool (1-indexed). None for main display.
     model : str
@@ -189,16 +220,36 @@ async def run(
         Safety limit on loop iterations.
     only_n_most_recent_images : int
         Keep only the N most recent screenshots to manage context.
+    max_history_turns : int
+        Once the history holds more than this many exchanges, the bodies
+        of all but the most recent few are archived to placeholders.
+    client : AsyncAnthropic or None
+        API client to use. A new one is created if None.
 
     Returns
     -------
     list[BetaMessageParam]
         The full conversation history.
     """
+    from anthropic import AsyncAnthropic
+    from dotenv import load_dotenv
+
+    from mac.loop import (
+        CACHE_CONTROL,
+        MESSAGE_BREAKPOINTS,
+        ConversationState,
+        make_tool_result,
+        prune_conversation,
+        response_to_params,
+        set_cache_breakpoints,
+        settle_tool_calls,
+    )
+    from mac.tool import MacTool
+
     load_dotenv()
 
-    cwd = Path.cwd()
-    client = Anthropic()
+    cwd = _CWD
+    client = client or AsyncAnthropic()
     mac_tool = MacTool(display=display)
     bash = BashSession()
     editor = TextEditor(working_directory=cwd)
@@ -216,13 +267,26 @@ async def run(
         else mac_tool.height,
     }
     bash_config = {"type": "bash_20250124", "name": "bash"}
+    # Last tool carries the breakpoint so system and all tools cache as one prefix
     editor_config = {
         "type": "text_editor_20250728",
         "name": "str_replace_based_edit_tool",
+        "cache_control": CACHE_CONTROL,
     }
 
+    # Built once so every request sends identical prefix objects
+    system_blocks = [{"type": "text", "text": system, "cache_control": CACHE_CONTROL}]
     tools = [computer_config, bash_config, editor_config]
-    messages: list[BetaMessageParam] = [{"role": "user", "content": prompt}]
+    thinking = {"thinking": {"type": "enabled", "budget_tokens": THINKING_BUDGET}}
+    if isinstance(prompt, str):
+        content, pinned = prompt, 0
+    else:
+        # The pinned breakpoint replaces a sliding one to stay within four
+        content = [dict(block) for block in prompt]
+        content[0]["cache_control"] = CACHE_CONTROL
+        pinned = 1
+    messages: list[BetaMessageParam] = [{"role": "user", "content": content}]
+    state = ConversationState()
 
     logger.info(
         "Starting agent: display=%dx%d, model=%s, cwd=%s",
@@ -231,7 +295,7 @@ async def run(
         model,
         cwd,
     )
-    logger.info("Prompt length: %d chars", len(prompt))
+    logger.info("Prompt length: %d chars", len(_prompt_text(prompt)))
 
     usage = UsageTracker()
     loop_start = time.monotonic()
@@ -239,77 +303,79 @@ async def run(
         for i in range(max_iterations):
             logger.info("--- Iteration %d/%d ---", i + 1, max_iterations)
 
-            if only_n_most_recent_images:
-                _prune_images(messages, only_n_most_recent_images)
+            prune_conversation(
+                messages,
+                keep_images=only_n_most_recent_images,
+                archive_threshold=2 * max_history_turns + 1,
+                state=state,
+            )
+            set_cache_breakpoints(
+                messages, count=MESSAGE_BREAKPOINTS - pinned, start=pinned
+            )
 
+            # Stream so text and thinking are logged as they arrive and each
+            # tool call starts as soon as its block is complete
             t0 = time.monotonic()
-            response = client.beta.messages.create(
-                model=model,
-                max_tokens=MAX_TOKENS,
-                system=[{"type": "text", "text": system}],
-                messages=messages,
-                tools=tools,
-                betas=[BETA_FLAG],
-                extra_body={
-                    "cache_control": {"type": "ephemeral"},
-                    "thinking": {
-                        "type": "enabled",
-                        "budget_tokens": THINKING_BUDGET,
-                    },
-                },
-            )
+            started: list[tuple[asyncio.Task[ToolResult], bool]] = []
+            pending: dict[str, asyncio.Task[ToolResult]] = {}
+            try:
+                async with client.beta.messages.stream(
+                    model=model,
+                    max_tokens=MAX_TOKENS,
+                    system=system_blocks,
+                    messages=messages,
+                    tools=tools,
+                    betas=[BETA_FLAG],
+                    extra_body=thinking,
+                ) as stream:
+                    async for event in stream:
+                        if event.type != "content_block_stop":
+                            continue
+                        block = event.content_block
+                        if block.type == "thinking":
+                            logger.info("[thinking] %s", block.thinking)
+                        elif block.type == "text":
+                            logger.info("[assistant] %s", block.text)
+                        elif block.type == "tool_use":
+                            pending[block.id] = _schedule_tool(
+                                block.name, block.input, started, mac_tool, bash, editor
+                            )
+                    response = await stream.get_final_message()
+            except BaseException as e:
+                await settle_tool_calls(
+                    pending.values(), cancel=isinstance(e, asyncio.CancelledError)
+                )
+                raise
             api_time = time.monotonic() - t0
             step_cost = usage.record(response, api_time)
 
             logger.info(
-                "Response: stop_reason=%s, blocks=%d, api=%.1fs",
+                "Response: stop_reason=%s, blocks=%d, api=%.1fs, "
+                "cache_write=%s, cache_read=%s",
                 response.stop_reason,
                 len(response.content),
                 api_time,
+                response.usage.cache_creation_input_tokens,
+                response.usage.cache_read_input_tokens,
             )
-            logger.info(usage.step_summary(i + 1, max_iterations, step_cost, api_time))
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    usage.step_summary(i + 1, max_iterations, step_cost, api_time)
+                )
 
-            assistant_content = _response_to_params(response)
+            assistant_content = response_to_params(response)
             messages.append({"role": "assistant", "content": assistant_content})
 
-            # Process tool use blocks
-            tool_results: list[BetaToolResultBlockParam] = []
-            for block in assistant_content:
-                if not isinstance(block, dict):
-                    continue
-                block_type = block.get("type")
-
-                if block_type == "thinking":
-                    logger.info("[thinking] %s", block.get("thinking", ""))
-                elif block_type == "text":
-                    logger.info("[assistant] %s", block["text"])
-                elif block_type == "tool_use":
-                    tool_name = block.get("name")
-                    inputs = block.get("input", {})
-                    t0 = time.monotonic()
-
-                    result = await _dispatch_tool(
-                        tool_name, inputs, mac_tool, bash, editor
-                    )
-
-                    tool_time = time.monotonic() - t0
-                    if result.error:
-                        logger.warning(
-                            "[%s] error (%.1fs): %s",
-                            tool_name,
-                            tool_time,
-                            result.error,
-                        )
-                    else:
-                        logger.info(
-                            "[%s] ok (%.1fs) output=%s%s",
-                            tool_name,
-                            tool_time,
-                            (result.output or "")[:200],
-                            " [screenshot]" if result.base64_image else "",
-                        )
-
-                    tool_results.append(_make_tool_result(result, block["id"]))
+            tool_blocks = [
+                block
+                for block in assistant_content
+                if isinstance(block, dict) and block.get("type") == "tool_use"
+            ]
+            results = await asyncio.gather(*(pending[b["id"]] for b in tool_blocks))
+            tool_results: list[BetaToolResultBlockParam] = [
+                make_tool_result(result, block["id"], state)
+                for result, block in zip(results, tool_blocks)
+            ]
 
             if not tool_results:
                 logger.info("Agent finished (no tool calls)")
@@ -335,12 +401,148 @@ async def run(
 
     finally:
         usage.wall_seconds = time.monotonic() - loop_start
-        logger.info(usage.summary())
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(usage.summary())
         bash.close()
 
     return messages
 
 
+async def run_many(
+    prompts: list[str | list[dict]],
+    *,
+    display: int | None = None,
+    **kwargs,
+) -> list[list[BetaMessageParam]]:
+    """Run one agent per prompt, one after another on the same display.
+
+    The runs cannot overlap: every agent drives the one mouse cursor and
+    keyboard focus, so a click or keystroke from one would land in
+    another's window. They share one API client and the cached system
+    prompt.
+
+    Parameters
+    ----------
+    prompts : list[str or list[dict]]
+        One task per agent.
+    display : int or None
+        Display number (1-indexed), or None for the main display.
+    **kwargs
+        Passed through to ``run``.
+
+    Returns
+    -------
+    list[list[BetaMessageParam]]
+        Each run's conversation history, in prompt order.
+    """
+    from anthropic import AsyncAnthropic
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    client = AsyncAnthropic()
+    return [
+        await run(prompt=prompt, display=display, client=client, **kwargs)
+        for prompt in prompts
+    ]
+
+
+def _prompt_text(prompt: str | list[dict]) -> str:
+    """Join a prompt given as text blocks back into one string."""
+    if isinstance(prompt, str):
+        return prompt
+    return "".join(block["text"] for block in prompt)
+
+
+def _schedule_tool(
+    tool_name: str,
+    inputs: dict,
+    started: list[tuple[asyncio.Task[ToolResult], bool]],
+    mac_tool: MacTool,
+    bash: BashSession,
+    editor: TextEditor,
+) -> asyncio.Task[ToolResult]:
+    """Start a tool call once the calls it may depend on are done.
+
+    The tools share state: bash reads files the editor writes, and
+    osascript in bash reads browser state that computer clicks change. So
+    calls run one after another in the order the model issued them, except
+    that read-only computer actions (screenshot, zoom, ...) issued before
+    any other call overlap with each other.
+
+    Parameters
+    ----------
+    tool_name : str
+        The tool name from the API response.
+    inputs : dict
+        The tool call inputs.
+    started : list[tuple[asyncio.Task[ToolResult], bool]]
+        The calls started so far this turn, each with whether it is
+        read-only. Updated in place.
+    mac_tool : MacTool
+        Computer use tool.
+    bash : BashSession
+        Bash session tool.
+    editor : TextEditor
+        Text editor tool.
+
+    Returns
+    -------
+    asyncio.Task[ToolResult]
+        The scheduled call.
+    """
+    from mac.tool import READ_ONLY_ACTIONS
+
+    read_only = tool_name == "computer" and inputs.get("action") in READ_ONLY_ACTIONS
+    if read_only and all(ro for _, ro in started):
+        after = []
+    else:
+        after = [task for task, _ in started]
+
+    async def run_after() -> ToolResult:
+        if after:
+            # Waited on, not awaited, so a failure there is not raised here
+            await asyncio.wait(after)
+        return await _timed_dispatch(tool_name, inputs, mac_tool, bash, editor)
+
+    task = asyncio.create_task(run_after())
+    started.append((task, read_only))
+    return task
+
+
+async def _timed_dispatch(
+    tool_name: str,
+    inputs: dict,
+    mac_tool: MacTool,
+    bash: BashSession,
+    editor: TextEditor,
+) -> ToolResult:
+    """Dispatch a single tool call and log its outcome and duration.
+
+    An exception from the runner becomes an error result, so one failed
+    call does not discard the results of the calls running beside it.
+    """
+    from mac.tool import ToolResult
+
+    t0 = time.monotonic()
+    try:
+        result = await _dispatch_tool(tool_name, inputs, mac_tool, bash, editor)
+    except Exception as e:
+        logger.exception("[%s] raised", tool_name)
+        result = ToolResult(error=f"{type(e).__name__}: {e}")
+    tool_time = time.monotonic() - t0
+    if result.error:
+        logger.warning("[%s] error (%.1fs): %s", tool_name, tool_time, result.error)
+    elif logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "[%s] ok (%.1fs) output=%s%s",
+            tool_name,
+            tool_time,
+            (result.output or "")[:200],
+            " [screenshot]" if result.base64_image else "",
+        )
+    return result
+
+
 async def _dispatch_tool(
     tool_name: str,
     inputs: dict,
@@ -368,20 +570,27 @@ async def _dispatch_tool(
     ToolResult
         Unified result object.
     """
+    from mac.loop import format_tool_input
+    from mac.tool import ToolResult
+
     if tool_name == "computer":
-        action = inputs.get("action", "")
-        detail = _format_inputs(inputs, skip=("action",))
-        logger.info("[computer] %s(%s)", action, detail)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "[computer] %s(%s)",
+                inputs.get("action", ""),
+                format_tool_input(inputs),
+            )
         return await mac_tool(**inputs)
 
     elif tool_name == "bash":
         command = inputs.get("command", "")
         restart = inputs.get("restart", False)
         logger.info("[bash] %s", "restart" if restart else command)
+        # The session blocks on its pipes, so keep it off the event loop
         if restart:
-            output = bash.restart()
+            output = await asyncio.to_thread(bash.restart)
         else:
-            output = bash.execute(command)
+            output = await asyncio.to_thread(bash.execute, command)
         return ToolResult(output=output)
 
     elif tool_name == "str_replace_based_edit_tool":
@@ -389,115 +598,13 @@ async def _dispatch_tool(
         path = inputs.get("path", "")
         logger.info("[editor] %s %s", command, path)
         params = {k: v for k, v in inputs.items() if k != "command"}
-        output = editor.execute(command, **params)
+        output = await asyncio.to_thread(editor.execute, command, **params)
         return ToolResult(output=output)
 
     else:
         return ToolResult(error=f"Unknown tool: {tool_name}")
 
 
-def _format_inputs(inputs: dict, skip: tuple = ()) -> str:
-    """Format tool inputs for logging."""
-    parts = []
-    for k, v in inputs.items():
-        if k in skip:
-            continue
-        parts.append(f"{k}={v}")
-    return ", ".join(parts)
-
-
-def _response_to_params(
-    response: BetaMessage,
-) -> list[BetaContentBlockParam]:
-    """Convert API response content blocks to params."""
-    params: list[BetaContentBlockParam] = []
-    for block in response.content:
-        if isinstance(block, BetaTextBlock):
-            if block.text:
-                params.append(BetaTextBlockParam(type="text", text=block.text))
-        elif getattr(block, "type", None) == "thinking":
-            params.append(
-                {
-                    "type": "thinking",
-                    "thinking": getattr(block, "thinking", None),
-                    "signature": getattr(block, "signature", None),
-                }
-            )
-        else:
-            params.append(block.model_dump())
-    return params
-
-
-def _make_tool_result(result: ToolResult, tool_use_id: str) -> BetaToolResultBlockParam:
-    """Convert a ToolResult to an API tool result block."""
-    content: list[BetaTextBlockParam | BetaImageBlockParam] | str = []
-    is_error = False
-
-    if result.error:
-        is_error = True
-        content = result.error
-    else:
-        if result.output:
-            content.append({"type": "text", "text": result.output})
-        if result.base64_image:
-            content.append(
-                {
-                    "type": "image",
-                    "source": {
-                        "type": "base64",
-                        "media_type": "image/png",
-                        "data": result.base64_image,
-                    },
-                }
-            )
-
-    return {
-        "type": "tool_result",
-        "content": content,
-        "tool_use_id": tool_use_id,
-        "is_error": is_error,
-    }
-
-
-def _prune_images(messages: list[BetaMessageParam], images_to_keep: int) -> None:
-    """Remove all but the most recent N images from tool results."""
-    tool_results = [
-        item
-        for message in messages
-        for item in (message["content"] if isinstance(message["content"], list) else [])
-        if isinstance(item, dict) and item.get("type") == "tool_result"
-    ]
-
-    total = sum(
-        1
-        for tr in tool_results
-        for content in tr.get("content", [])
-        if isinstance(content, dict) and content.get("type") == "image"
-    )
-
-    to_remove = total - images_to_keep
-    if to_remove <= 0:
-        return
-
-    removed = 0
-    for tr in tool_results:
-        if removed >= to_remove:
-            break
-        if not isinstance(tr.get("content"), list):
-            continue
-        new_content = []
-        for content in tr["content"]:
-            if (
-                isinstance(content, dict)
-                and content.get("type") == "image"
-                and removed < to_remove
-            ):
-                removed += 1
-                continue
-            new_content.append(content)
-        tr["content"] = new_content
-
-
 # --- CLI entry point ---
 
 LOG_DIR = Path("logs")
@@ -516,6 +623,11 @@ def main():
         type=int,
         help="Item number from the shopping brief (1-7)",
     )
+    group.add_argument(
+        "--items",
+        type=_int_list,
+        help="Comma-separated item numbers to run as separate agents (e.g. 1,2,3)",
+    )
     group.add_argument(
         "--task",
         type=str,
@@ -546,15 +658,17 @@ def main():
     )
     args = parser.parse_args()
 
-    if args.item:
-        prompt = build_task_prompt(args.item)
+    if args.items:
+        prompts = [build_task_prompt(item) for item in args.items]
+    elif args.item:
+        prompts = [build_task_prompt(args.item)]
     elif args.task:
-        prompt = build_freeform_prompt(args.task)
+        prompts = [build_freeform_prompt(args.task)]
     else:
-        prompt = args.raw
+        prompts = [args.raw]
 
     if args.dry_run:
-        print(prompt)
+        print("\n\n".join(_prompt_text(prompt) for prompt in prompts))
         return
 
     LOG_DIR.mkdir(exist_ok=True)
@@ -572,14 +686,22 @@ def main():
 
     logger.info("Logging to %s", log_file)
 
+    from mac.loop import new_event_loop
+
     asyncio.run(
-        run(
-            prompt=prompt,
+        run_many(
+            prompts,
             display=args.display,
             max_iterations=args.max_iterations,
-        )
+        ),
+        loop_factory=new_event_loop,
     )
 
 
+def _int_list(text: str) -> list[int]:
+    """Parse a comma-separated list of integers from the command line."""
+    return [int(part) for part in text.split(",")]
+
+
 if __name__ == "__main__":
     main()
@@ -1,20 +1,37 @@
 """Prompt builder for the shopping agent.
 
 Reads the shopping brief and constructs task prompts for individual
-items on the buy-next queue.
+items on the buy-next queue. Prompts are returned as two text blocks:
+the brief, which is identical across runs and so worth caching, and the
+task itself.
 """
 
+import functools
 from pathlib import Path
 
 DOCS_DIR = Path(__file__).parent / "docs"
 
 
 def load_brief() -> str:
-    """Load the shopping brief as a string."""
-    return (DOCS_DIR / "shopping-brief.md").read_text()
+    """Load the shopping brief as a string.
+
+    The file is only reread when its modification time changes.
+    """
+    path = DOCS_DIR / "shopping-brief.md"
+    return _read_brief(path, path.stat().st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=1)
+def _read_brief(path: Path, mtime_ns: int) -> str:
+    return path.read_text()
 
 
-def build_task_prompt(item_number: int) -> str:
+def _text_blocks(*texts: str) -> list[dict]:
+    """Wrap strings as user message text blocks."""
+    return [{"type": "text", "text": text} for text in texts]
+
+
+def build_task_prompt(item_number: int) -> list[dict]:
     """Build a task prompt for a specific item on the buy-next queue.
 
     Parameters
@@ -24,12 +41,13 @@ def build_task_prompt(item_number: int) -> str:
 
     Returns
     -------
-    str
-        A complete prompt for the agent.
+    list[dict]
+        Text blocks for the first user message: the brief, then the task.
     """
     brief = load_brief()
 
-    return f"""\
+    return _text_blocks(
+        f"""\
 You are a personal shopper. Your job is to find good options for a \
 specific item from the shopping brief below.
 
@@ -37,6 +55,8 @@ specific item from the shopping brief below.
 {brief}
 </SHOPPING_BRIEF>
 
+""",
+        f"""\
 <TASK>
 Find options for item #{item_number} from the "Buy Next" list.
 
@@ -74,10 +94,11 @@ and finalize the results. Do not continue optimizing.
 Never recommend products from memory — every option must have a \
 real URL you navigated to.
 </TASK>
-"""
+""",
+    )
 
 
-def build_freeform_prompt(task: str) -> str:
+def build_freeform_prompt(task: str) -> list[dict]:
     """Build a prompt for a freeform shopping task.
 
     Parameters
@@ -88,12 +109,13 @@ def build_freeform_prompt(task: str) -> str:
 
     Returns
     -------
-    str
-        A complete prompt for the agent.
+    list[dict]
+        Text blocks for the first user message: the brief, then the task.
     """
     brief = load_brief()
 
-    return f"""\
+    return _text_blocks(
+        f"""\
 You are a personal shopper. Here is the shopper's profile and \
 preferences:
 
@@ -101,6 +123,8 @@ preferences:
 {brief}
 </SHOPPING_BRIEF>
 
+""",
+        f"""\
 <TASK>
 {task}
 
@@ -131,4 +155,5 @@ and finalize the results. Do not continue optimizing.
 Never recommend products from memory — every option must have a \
 real URL you navigated to.
 </TASK>
-"""
+""",
+    )
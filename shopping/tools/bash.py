@@ -5,11 +5,14 @@ variables, and other shell state carry across commands. Uses sentinel-based
 output delimiting to know when a command has finished.
 """
 
-import queue
+import os
+import selectors
 import subprocess
-import threading
+import time
 import uuid
 
+READ_SIZE = 65536
+
 
 class BashSession:
     """A persistent bash session that executes commands and captures output.
@@ -23,8 +26,6 @@ class BashSession:
     def __init__(self, timeout: int = 30):
         self._timeout = timeout
         self._process: subprocess.Popen | None = None
-        self._output_queue: queue.Queue[str] = queue.Queue()
-        self._error_queue: queue.Queue[str] = queue.Queue()
         self._start()
 
     def _start(self) -> None:
@@ -38,55 +39,63 @@ class BashSession:
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
             bufsize=0,
         )
-        self._output_queue = queue.Queue()
-        self._error_queue = queue.Queue()
-        self._start_readers()
-
-    def _start_readers(self) -> None:
-        """Spawn daemon threads to read stdout and stderr without blocking."""
-        for stream, q in [
-            (self._process.stdout, self._output_queue),
-            (self._process.stderr, self._error_queue),
-        ]:
-            t = threading.Thread(target=self._reader, args=(stream, q), daemon=True)
-            t.start()
-
-    @staticmethod
-    def _reader(stream, q: queue.Queue) -> None:
-        """Read lines from a stream and put them on a queue."""
-        for line in stream:
-            q.put(line)
-
-    def _read_queue(self, q: queue.Queue, sentinel: str, timeout: int) -> str:
-        """Read from a queue until a sentinel line is found or timeout expires.
+        # Output is drained straight from the descriptors, never via the
+        # file objects, so reads return whatever is available
+        os.set_blocking(self._process.stdout.fileno(), False)
+        os.set_blocking(self._process.stderr.fileno(), False)
+
+    def _drain(self, sentinel: bytes, timeout: int) -> tuple[bytearray, bytearray]:
+        """Read stdout and stderr until both print the sentinel line.
 
         Parameters
         ----------
-        q : queue.Queue
-            The queue to read from.
-        sentinel : str
-            The sentinel string that marks the end of output.
+        sentinel : bytes
+            The marker echoed on its own line on each stream after the
+            command finishes.
         timeout : int
-            Maximum seconds to wait for output.
+            Maximum seconds to wait for both streams.
 
         Returns
         -------
-        str
-            Collected output lines joined together.
+        tuple[bytearray, bytearray]
+            Output on stdout and stderr before the sentinel line, or
+            everything read so far if the timeout expires or a stream
+            closes first.
         """
-        lines = []
-        while True:
-            try:
-                line = q.get(timeout=timeout)
-            except queue.Empty:
-                break
-            if line.strip() == sentinel:
-                break
-            lines.append(line)
-        return "".join(lines)
+        marker = b"\n" + sentinel + b"\n"
+        # Each buffer is only searched from just before its newest bytes
+        buffers = {
+            self._process.stdout.fileno(): bytearray(),
+            self._process.stderr.fileno(): bytearray(),
+        }
+        scanned = dict.fromkeys(buffers, 0)
+        deadline = time.monotonic() + timeout
+        with selectors.DefaultSelector() as selector:
+            for fd in buffers:
+                selector.register(fd, selectors.EVENT_READ)
+            while selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                for key, _ in selector.select(remaining):
+                    fd = key.fd
+                    chunk = os.read(fd, READ_SIZE)
+                    if not chunk:
+                        selector.unregister(fd)
+                        continue
+                    buffer = buffers[fd]
+                    buffer += chunk
+                    index = buffer.find(marker, scanned[fd])
+                    if index == -1:
+                        scanned[fd] = max(0, len(buffer) - len(marker) + 1)
+                        continue
+                    del buffer[index:]
+                    selector.unregister(fd)
+
+        stdout, stderr = buffers.values()
+        return stdout, stderr
 
     def execute(self, command: str, timeout: int | None = None) -> str:
         """Execute a command and return its combined stdout and stderr.
@@ -120,16 +129,11 @@ class BashSession:
             f"printf '\\n' >&2\n"
             f"echo {sentinel} >&2\n"
         )
-        self._process.stdin.write(full_command)
+        self._process.stdin.write(full_command.encode())
         self._process.stdin.flush()
 
-        stdout = self._read_queue(self._output_queue, sentinel, timeout)
-        stderr = self._read_queue(self._error_queue, sentinel, timeout)
-
-        result = stdout
-        if stderr:
-            result = result + stderr
-        return result.strip()
+        stdout, stderr = self._drain(sentinel.encode(), timeout)
+        return (stdout + stderr).decode("utf-8", "replace").strip()
 
     def restart(self) -> str:
         """Kill the current session and start a fresh one.
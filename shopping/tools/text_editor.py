@@ -7,6 +7,8 @@ and written relative to a configurable working directory.
 import os
 from pathlib import Path
 
+MAX_CACHED_FILES = 8
+
 
 class TextEditor:
     """Executes text editor tool commands from Claude.
@@ -18,7 +20,16 @@ class TextEditor:
     """
 
     def __init__(self, working_directory: str | Path | None = None):
-        self._cwd = Path(working_directory or os.getcwd()).resolve()
+        # getcwd already returns the physical path, so only a caller's
+        # directory needs resolving
+        self._cwd = (
+            Path(working_directory).resolve()
+            if working_directory
+            else Path(os.getcwd())
+        )
+        # Contents of recently touched files, keyed by path and tagged with
+        # the (mtime, size) they were read or written at
+        self._files: dict[Path, tuple[tuple[int, int], str]] = {}
 
     def _resolve(self, path: str) -> Path:
         """Resolve a path relative to the working directory.
@@ -44,6 +55,59 @@ class TextEditor:
                 pass
         return (self._cwd / p).resolve()
 
+    def _read(self, path: Path) -> str:
+        """Read a file, reusing the cached contents if it is unchanged.
+
+        Parameters
+        ----------
+        path : Path
+            Resolved file path.
+
+        Returns
+        -------
+        str
+            The file's contents.
+        """
+        st = path.stat()
+        tag = (st.st_mtime_ns, st.st_size)
+        cached = self._files.get(path)
+        if cached is not None and cached[0] == tag:
+            return cached[1]
+        content = path.read_text(encoding="utf-8")
+        self._remember(path, tag, content)
+        return content
+
+    def _write(self, path: Path, content: str, exclusive: bool = False) -> None:
+        """Write a file and cache what was written.
+
+        Parameters
+        ----------
+        path : Path
+            Resolved file path.
+        content : str
+            The new contents.
+        exclusive : bool
+            Fail with ``FileExistsError`` instead of overwriting.
+        """
+        flags = os.O_WRONLY | os.O_CREAT | (os.O_EXCL if exclusive else os.O_TRUNC)
+        data = memoryview(content.encode())
+        fd = os.open(path, flags, 0o666)
+        try:
+            while data:
+                data = data[os.write(fd, data) :]
+            # Stat the open file rather than looking the path up again
+            st = os.fstat(fd)
+        finally:
+            os.close(fd)
+        self._remember(path, (st.st_mtime_ns, st.st_size), content)
+
+    def _remember(self, path: Path, tag: tuple[int, int], content: str) -> None:
+        """Cache a file's contents, evicting the least recently stored."""
+        self._files.pop(path, None)
+        self._files[path] = (tag, content)
+        if len(self._files) > MAX_CACHED_FILES:
+            del self._files[next(iter(self._files))]
+
     def execute(self, command: str, **params) -> str:
         """Dispatch a text editor command.
 
@@ -102,7 +166,7 @@ class TextEditor:
         if not resolved.is_file():
             return f"Error: File not found: {path}"
 
-        lines = resolved.read_text().splitlines(keepends=True)
+        lines = self._read(resolved).splitlines(keepends=True)
 
         if view_range is not None:
             start, end = view_range
@@ -144,22 +208,22 @@ class TextEditor:
         if not resolved.is_file():
             return f"Error: File not found: {path}"
 
-        content = resolved.read_text()
-        count = content.count(old_str)
-
-        if count == 0:
+        content = self._read(resolved)
+        # Two finds settle uniqueness; only the error path counts every match
+        start = content.find(old_str)
+        if start == -1:
             return (
                 "Error: No match found for replacement. "
                 "Please check your text and try again."
             )
-        elif count > 1:
+        end = start + len(old_str)
+        if content.find(old_str, end) != -1:
             return (
-                f"Error: Found {count} matches for replacement text. "
-                "Please provide more context to make a unique match."
+                f"Error: Found {content.count(old_str)} matches for replacement "
+                "text. Please provide more context to make a unique match."
             )
 
-        new_content = content.replace(old_str, new_str, 1)
-        resolved.write_text(new_content)
+        self._write(resolved, content[:start] + new_str + content[end:])
         return "Successfully replaced text at exactly one location."
 
     def _create(self, path: str, file_text: str) -> str:
@@ -178,11 +242,11 @@ class TextEditor:
             Success or error message.
         """
         resolved = self._resolve(path)
-        if resolved.exists():
-            return f"Error: File already exists: {path}"
-
         resolved.parent.mkdir(parents=True, exist_ok=True)
-        resolved.write_text(file_text)
+        try:
+            self._write(resolved, file_text, exclusive=True)
+        except FileExistsError:
+            return f"Error: File already exists: {path}"
         return f"Successfully created file {path}"
 
     def _insert(self, path: str, insert_line: int, insert_text: str) -> str:
@@ -206,12 +270,14 @@ class TextEditor:
         if not resolved.is_file():
             return f"Error: File not found: {path}"
 
-        lines = resolved.read_text().splitlines(keepends=True)
+        content = self._read(resolved)
+        unterminated = bool(content) and not content.endswith("\n")
+        line_count = content.count("\n") + unterminated
 
-        if insert_line < 0 or insert_line > len(lines):
+        if insert_line < 0 or insert_line > line_count:
             return (
                 f"Error: insert_line {insert_line} is out of range. "
-                f"Use 0 to insert at the beginning, or 1-{len(lines)} "
+                f"Use 0 to insert at the beginning, or 1-{line_count} "
                 f"to insert after that line."
             )
 
@@ -219,7 +285,13 @@ class TextEditor:
         if insert_text and not insert_text.endswith("\n"):
             insert_text += "\n"
 
-        insert_lines = insert_text.splitlines(keepends=True)
-        new_lines = lines[:insert_line] + insert_lines + lines[insert_line:]
-        resolved.write_text("".join(new_lines))
+        # Walk newlines to the insertion point rather than splitting lines
+        offset = 0
+        for _ in range(insert_line):
+            offset = content.find("\n", offset) + 1
+        if insert_line == line_count and unterminated:
+            offset = len(content)
+            insert_text = "\n" + insert_text
+
+        self._write(resolved, content[:offset] + insert_text + content[offset:])
         return f"Successfully inserted text after line {insert_line}."
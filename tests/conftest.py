@@ -0,0 +1,7 @@
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-screencapture",
+        action="store_true",
+        default=False,
+        help="Capture the real screen instead of a generated image",
+    )
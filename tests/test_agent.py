@@ -0,0 +1,222 @@
+"""Tests for the shopping agent helpers."""
+
+import asyncio
+import time
+
+import anthropic
+import pytest
+
+from mac.tool import ToolResult
+from shopping import agent
+from shopping.agent import (
+    COST_PER_INPUT_TOKEN,
+    UsageTracker,
+    _build_system_prompt,
+    _schedule_tool,
+    _system_prompt,
+)
+
+
+class FakeComputer:
+    """Computer tool stand-in that records when each action starts and ends."""
+
+    def __init__(self, events):
+        self.events = events
+
+    async def __call__(self, action, **kwargs):
+        self.events.append(f"start {action}")
+        await asyncio.sleep(0.05)
+        self.events.append(f"end {action}")
+        return ToolResult(output=action)
+
+
+class FakeBash:
+    """Bash session stand-in that records each command."""
+
+    def __init__(self, events):
+        self.events = events
+
+    def execute(self, command):
+        self.events.append(f"bash {command}")
+        return command
+
+
+class FakeEditor:
+    """Text editor stand-in that records each command after a short delay."""
+
+    def __init__(self, events):
+        self.events = events
+
+    def execute(self, command, **params):
+        time.sleep(0.05)
+        self.events.append(f"edit {command}")
+        return command
+
+
+class FailingBash:
+    """Bash session stand-in whose commands always raise."""
+
+    def execute(self, command):
+        raise OSError("pipe closed")
+
+
+def tool_use(tool_use_id, name, **inputs):
+    """Create a tool_use block."""
+    return {"type": "tool_use", "id": tool_use_id, "name": name, "input": inputs}
+
+
+async def dispatch(blocks, events):
+    """Schedule every block as the agent loop does and gather the results."""
+    started = []
+    tasks = [
+        _schedule_tool(
+            b["name"],
+            b["input"],
+            started,
+            FakeComputer(events),
+            FakeBash(events),
+            FakeEditor(events),
+        )
+        for b in blocks
+    ]
+    return await asyncio.gather(*tasks)
+
+
+class TestUsageTracker:
+    def test_cache_hit_rate(self):
+        usage = UsageTracker(
+            input_tokens=100,
+            cache_creation_input_tokens=100,
+            cache_read_input_tokens=800,
+        )
+        assert usage.cache_hit_rate == pytest.approx(0.8)
+
+    def test_cache_hit_rate_without_usage(self):
+        assert UsageTracker().cache_hit_rate == 0.0
+
+    def test_cache_savings(self):
+        usage = UsageTracker(cache_read_input_tokens=1_000)
+        assert usage.cache_savings_usd == pytest.approx(
+            1_000 * COST_PER_INPUT_TOKEN * 0.9
+        )
+
+    def test_step_summary_shows_hits_only_when_cached(self):
+        usage = UsageTracker(input_tokens=100)
+        assert "cache_hit" not in usage.step_summary(1, 10, 0.0, 1.0)
+        usage.cache_read_input_tokens = 300
+        assert "cache_hit=75%" in usage.step_summary(1, 10, 0.0, 1.0)
+
+    def test_summary_reports_cache(self):
+        usage = UsageTracker(input_tokens=100, cache_read_input_tokens=100)
+        assert "Cache hit:     50.0%" in usage.summary()
+
+
+class TestScheduleTool:
+    async def test_results_follow_block_order(self):
+        events = []
+        blocks = [
+            tool_use("t0", "computer", action="screenshot"),
+            tool_use("t1", "bash", command="ls"),
+            tool_use("t2", "computer", action="zoom"),
+        ]
+        results = await dispatch(blocks, events)
+        assert [r.output for r in results] == ["screenshot", "ls", "zoom"]
+
+    async def test_leading_read_only_calls_overlap(self):
+        events = []
+        blocks = [
+            tool_use("t0", "computer", action="screenshot"),
+            tool_use("t1", "computer", action="zoom"),
+        ]
+        await dispatch(blocks, events)
+        assert events.index("start zoom") < events.index("end screenshot")
+
+    async def test_screenshot_waits_for_click(self):
+        events = []
+        blocks = [
+            tool_use("t0", "computer", action="left_click"),
+            tool_use("t1", "computer", action="screenshot"),
+        ]
+        await dispatch(blocks, events)
+        assert events == [
+            "start left_click",
+            "end left_click",
+            "start screenshot",
+            "end screenshot",
+        ]
+
+    async def test_bash_waits_for_click(self):
+        events = []
+        blocks = [
+            tool_use("t0", "computer", action="left_click"),
+            tool_use("t1", "bash", command="osascript"),
+        ]
+        await dispatch(blocks, events)
+        assert events.index("end left_click") < events.index("bash osascript")
+
+    async def test_bash_waits_for_editor(self):
+        events = []
+        blocks = [
+            tool_use("t0", "str_replace_based_edit_tool", command="create", path="a"),
+            tool_use("t1", "bash", command="cat a"),
+        ]
+        await dispatch(blocks, events)
+        assert events == ["edit create", "bash cat a"]
+
+
+class TestSystemPrompt:
+    def test_reused_for_same_cwd(self, tmp_path):
+        assert _build_system_prompt(tmp_path) is _build_system_prompt(tmp_path)
+
+    def test_rebuilt_for_new_date(self, tmp_path):
+        first = _system_prompt(tmp_path, "Monday, March 2, 2026")
+        second = _system_prompt(tmp_path, "Tuesday, March 3, 2026")
+        assert "Monday, March 2, 2026" in first
+        assert "Tuesday, March 3, 2026" in second
+
+    async def test_exception_becomes_error_result(self):
+        events = []
+        started = []
+        failed = _schedule_tool(
+            "bash", {"command": "ls"}, started, None, FailingBash(), None
+        )
+        ok = _schedule_tool(
+            "computer", {"action": "zoom"}, started, FakeComputer(events), None, None
+        )
+        results = await asyncio.gather(failed, ok)
+        assert results[0].error == "OSError: pipe closed"
+        assert results[1].output == "zoom"
+
+
+class TestRunMany:
+    @pytest.fixture
+    def runs(self, monkeypatch):
+        """Replace run() with a stub that records which display each run used."""
+        monkeypatch.setattr(anthropic, "AsyncAnthropic", lambda: "client")
+        runs = []
+
+        async def fake_run(*, prompt, display, client, **kwargs):
+            runs.append(("start", prompt, display))
+            await asyncio.sleep(0.02)
+            runs.append(("end", prompt, display))
+            return [{"role": "user", "content": prompt}]
+
+        monkeypatch.setattr(agent, "run", fake_run)
+        return runs
+
+    async def test_results_in_prompt_order(self, runs):
+        results = await agent.run_many(["a", "b", "c"], display=2)
+        assert [r[0]["content"] for r in results] == ["a", "b", "c"]
+
+    async def test_runs_never_overlap(self, runs):
+        await agent.run_many(["a", "b"], display=2)
+        assert runs == [
+            ("start", "a", 2),
+            ("end", "a", 2),
+            ("start", "b", 2),
+            ("end", "b", 2),
+        ]
+
+    async def test_defaults_to_main_display(self, runs):
+        await agent.run_many(["a"])
+        assert {d for _, _, d in runs} == {None}
@@ -1,61 +1,72 @@
 """Tests for the bash session tool runner."""
 
+import pytest
+
 from shopping.tools.bash import BashSession
 
 
+@pytest.fixture(scope="class")
+def session():
+    """Share one bash process across a test class, for stateless commands."""
+    session = BashSession()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def own_session():
+    """Create a fresh bash process for a test that leaves shell state behind."""
+    session = BashSession()
+    yield session
+    session.close()
+
+
 class TestBashSession:
-    def test_simple_command(self):
-        session = BashSession()
+    def test_simple_command(self, session):
         result = session.execute("echo hello")
         assert result == "hello"
-        session.close()
 
-    def test_working_directory_persists(self):
-        session = BashSession()
-        session.execute("cd /tmp")
-        result = session.execute("pwd")
+    def test_working_directory_persists(self, own_session):
+        own_session.execute("cd /tmp")
+        result = own_session.execute("pwd")
         assert result == "/tmp"
-        session.close()
 
-    def test_environment_persists(self):
-        session = BashSession()
-        session.execute("export FOO=bar")
-        result = session.execute("echo $FOO")
+    def test_environment_persists(self, own_session):
+        own_session.execute("export FOO=bar")
+        result = own_session.execute("echo $FOO")
         assert result == "bar"
-        session.close()
 
-    def test_stderr_captured(self):
-        session = BashSession()
+    def test_stderr_captured(self, session):
         result = session.execute("echo oops >&2")
         assert "oops" in result
-        session.close()
 
-    def test_multiline_output(self):
-        session = BashSession()
+    def test_multiline_output(self, session):
         result = session.execute("echo line1; echo line2; echo line3")
         assert result == "line1\nline2\nline3"
-        session.close()
 
-    def test_restart(self):
-        session = BashSession()
-        session.execute("export FOO=bar")
-        result = session.execute("echo $FOO")
+    def test_restart(self, own_session):
+        result = own_session.execute("export FOO=bar; echo $FOO")
         assert result == "bar"
-        session.restart()
-        result = session.execute("echo ${FOO:-empty}")
+        own_session.restart()
+        result = own_session.execute("echo ${FOO:-empty}")
         assert result == "empty"
-        session.close()
 
-    def test_command_with_exit_code(self):
-        session = BashSession()
+    def test_command_with_exit_code(self, session):
         result = session.execute("ls /nonexistent 2>&1; echo done")
         assert "done" in result
-        session.close()
 
-    def test_no_trailing_newline(self):
+    def test_no_trailing_newline(self, session):
         """Commands like pbpaste that don't end with a newline."""
-        session = BashSession()
         result = session.execute("printf 'no newline here'")
         assert result == "no newline here"
         assert "__SENTINEL" not in result
-        session.close()
+
+    def test_large_output(self, session):
+        result = session.execute("seq 1 100000")
+        lines = result.split("\n")
+        assert len(lines) == 100000
+        assert lines[-1] == "100000"
+
+    def test_timeout_returns_partial_output(self, own_session):
+        result = own_session.execute("echo started; sleep 5", timeout=1)
+        assert result == "started"
@@ -0,0 +1,619 @@
+"""Tests for the agent loop helpers."""
+
+import asyncio
+import json
+import sys
+from types import SimpleNamespace
+
+import pytest
+from anthropic.types.beta import (
+    BetaMessage,
+    BetaRedactedThinkingBlock,
+    BetaTextBlock,
+    BetaThinkingBlock,
+    BetaToolUseBlock,
+    BetaUsage,
+)
+from anthropic.types.beta.parsed_beta_message import ParsedBetaTextBlock
+
+from mac.loop import (
+    ARCHIVED,
+    CACHE_CONTROL,
+    IMAGE_TOKENS,
+    PRUNED_IMAGE,
+    ConversationState,
+    _compact_turns,
+    _estimate_tokens,
+    _schedule_tool,
+    agent_loop,
+    make_tool_result,
+    new_event_loop,
+    prune_conversation,
+    prune_images,
+    response_to_params,
+    set_cache_breakpoints,
+)
+from mac.tool import ToolResult
+
+
+def image_block(data="img"):
+    """Create a base64 image content block."""
+    return {
+        "type": "image",
+        "source": {"type": "base64", "media_type": "image/png", "data": data},
+    }
+
+
+def tool_result_message(tool_use_id="t1", content=None):
+    """Create a user message carrying a single tool result."""
+    return {
+        "role": "user",
+        "content": [
+            {
+                "type": "tool_result",
+                "tool_use_id": tool_use_id,
+                "content": content if content is not None else [],
+                "is_error": False,
+            }
+        ],
+    }
+
+
+def assistant_message(tool_use_id="t1", thinking="hmm"):
+    """Create an assistant turn with a thinking block and a tool call."""
+    return {
+        "role": "assistant",
+        "content": [
+            {"type": "thinking", "thinking": thinking, "signature": "sig"},
+            {
+                "type": "tool_use",
+                "id": tool_use_id,
+                "name": "computer",
+                "input": {"action": "screenshot"},
+            },
+        ],
+    }
+
+
+def conversation(turns):
+    """Create a task prompt followed by ``turns`` tool use exchanges."""
+    messages = [{"role": "user", "content": "task"}]
+    for i in range(turns):
+        messages.append(assistant_message(f"t{i}", thinking=f"thought{i}"))
+        messages.append(tool_result_message(f"t{i}", [image_block(f"img{i}")]))
+    return messages
+
+
+def marked_blocks(messages):
+    """Collect the content blocks carrying a cache breakpoint, oldest first."""
+    return [
+        block
+        for message in messages
+        if isinstance(message["content"], list)
+        for block in message["content"]
+        if "cache_control" in block
+    ]
+
+
+def image_data(messages):
+    """Collect the image payloads remaining in a conversation, oldest first."""
+    return [
+        c["source"]["data"]
+        for message in messages
+        if isinstance(message["content"], list)
+        for item in message["content"]
+        if item.get("type") == "tool_result" and isinstance(item["content"], list)
+        for c in item["content"]
+        if c.get("type") == "image"
+    ]
+
+
+def make_response(content):
+    """Create an assistant API response with the given content blocks."""
+    return BetaMessage(
+        id="msg_1",
+        type="message",
+        role="assistant",
+        model="claude-opus-4-6",
+        content=content,
+        stop_reason="tool_use",
+        usage=BetaUsage(input_tokens=1, output_tokens=1),
+    )
+
+
+class TestResponseToParams:
+    def test_converts_thinking_and_text(self):
+        response = make_response(
+            [
+                BetaThinkingBlock(type="thinking", thinking="hmm", signature="sig"),
+                BetaRedactedThinkingBlock(type="redacted_thinking", data="xyz"),
+                BetaTextBlock(type="text", text="hello"),
+            ]
+        )
+        assert response_to_params(response) == [
+            {"type": "thinking", "thinking": "hmm", "signature": "sig"},
+            {"type": "redacted_thinking", "data": "xyz"},
+            {"type": "text", "text": "hello"},
+        ]
+
+    def test_drops_empty_text(self):
+        response = make_response([BetaTextBlock(type="text", text="")])
+        assert response_to_params(response) == []
+
+    def test_converts_streamed_text_blocks(self):
+        # get_final_message() returns ParsedBetaTextBlock, a BetaTextBlock subclass
+        response = make_response(
+            [
+                ParsedBetaTextBlock(type="text", text="hello"),
+                ParsedBetaTextBlock(type="text", text=""),
+            ]
+        )
+        assert type(response.content[0]) is ParsedBetaTextBlock
+        assert response_to_params(response) == [{"type": "text", "text": "hello"}]
+
+    def test_tool_use_round_trips(self):
+        block = BetaToolUseBlock(
+            type="tool_use", id="t1", name="computer", input={"action": "screenshot"}
+        )
+        assert response_to_params(make_response([block])) == [
+            {
+                "type": "tool_use",
+                "id": "t1",
+                "name": "computer",
+                "input": {"action": "screenshot"},
+            }
+        ]
+
+
+class TestSetCacheBreakpoints:
+    def test_converts_string_prompt(self):
+        messages = [{"role": "user", "content": "do the thing"}]
+        set_cache_breakpoints(messages)
+        assert messages[0]["content"] == [
+            {"type": "text", "text": "do the thing", "cache_control": CACHE_CONTROL}
+        ]
+
+    def test_respects_count(self):
+        messages = [
+            {"role": "user", "content": "task"},
+            {"role": "assistant", "content": [{"type": "text", "text": "ok"}]},
+            tool_result_message(),
+        ]
+        set_cache_breakpoints(messages, count=1)
+        assert messages[-1]["content"][-1]["cache_control"] == CACHE_CONTROL
+        assert "cache_control" not in messages[0]["content"][-1]
+
+    def test_marks_two_newest_user_turns(self):
+        messages = conversation(3)
+        set_cache_breakpoints(messages)
+        assert marked_blocks(messages) == [
+            messages[-3]["content"][-1],
+            messages[-1]["content"][-1],
+        ]
+
+    def test_start_keeps_pinned_breakpoint(self):
+        messages = conversation(2)
+        messages[0]["content"] = [
+            {"type": "text", "text": "brief", "cache_control": CACHE_CONTROL},
+            {"type": "text", "text": "task"},
+        ]
+        set_cache_breakpoints(messages, count=1, start=1)
+        assert marked_blocks(messages) == [
+            messages[0]["content"][0],
+            messages[-1]["content"][-1],
+        ]
+
+    def test_moves_breakpoints_forward(self):
+        messages = conversation(2)
+        set_cache_breakpoints(messages)
+        messages.append(assistant_message("t2"))
+        messages.append(tool_result_message("t2"))
+        set_cache_breakpoints(messages)
+        assert marked_blocks(messages) == [
+            messages[-3]["content"][-1],
+            messages[-1]["content"][-1],
+        ]
+
+
+class TestPruneImages:
+    def test_keeps_most_recent(self):
+        messages = [{"role": "user", "content": "task"}] + [
+            tool_result_message(f"t{i}", [image_block(f"img{i}")]) for i in range(5)
+        ]
+        prune_images(messages, 3)
+        assert image_data(messages) == ["img2", "img3", "img4"]
+
+    def test_under_limit_is_noop(self):
+        messages = [tool_result_message("t0", [image_block("img0")])]
+        content = messages[0]["content"][0]["content"]
+        prune_images(messages, 3)
+        assert messages[0]["content"][0]["content"] is content
+
+    def test_keeps_newest_within_one_result(self):
+        messages = [
+            tool_result_message("t0", [image_block("a"), image_block("b")]),
+            tool_result_message("t1", [image_block("c")]),
+        ]
+        prune_images(messages, 2)
+        assert image_data(messages) == ["b", "c"]
+
+    def test_preserves_text_blocks(self):
+        text = {"type": "text", "text": "X=1,Y=2"}
+        messages = [
+            tool_result_message("t0", [text, image_block("a")]),
+            tool_result_message("t1", [image_block("b")]),
+        ]
+        prune_images(messages, 1)
+        assert messages[0]["content"][0]["content"] == [
+            text,
+            {"type": "text", "text": PRUNED_IMAGE},
+        ]
+        assert image_data(messages) == ["b"]
+
+    def test_releases_pruned_payload(self):
+        old = image_block("a")
+        messages = [
+            tool_result_message("t0", [old]),
+            tool_result_message("t1", [image_block("b")]),
+        ]
+        prune_images(messages, 1)
+        assert old["source"]["data"] == ""
+
+    def test_ignores_string_error_content(self):
+        messages = [
+            tool_result_message("t0", "boom"),
+            tool_result_message("t1", [image_block("a")]),
+        ]
+        prune_images(messages, 0)
+        assert messages[0]["content"][0]["content"] == "boom"
+        assert image_data(messages) == []
+
+    def test_state_skips_scan(self):
+        messages = [
+            tool_result_message(f"t{i}", [image_block(f"img{i}")]) for i in range(5)
+        ]
+        prune_images(messages, 3, ConversationState())
+        assert len(image_data(messages)) == 5
+
+    def test_state_skips_replaced_blocks(self):
+        messages = [
+            tool_result_message(f"t{i}", [image_block(f"img{i}")]) for i in range(3)
+        ]
+        state = ConversationState.from_messages(messages)
+        messages[0]["content"][0]["content"][0] = {"type": "text", "text": "gone"}
+        prune_images(messages, 1, state)
+        assert image_data(messages) == ["img2"]
+        assert messages[0]["content"][0]["content"] == [
+            {"type": "text", "text": "gone"}
+        ]
+        assert state.image_count == 1
+
+    def test_state_reset_after_prune(self):
+        messages = [
+            tool_result_message(f"t{i}", [image_block(f"img{i}")]) for i in range(5)
+        ]
+        state = ConversationState.from_messages(messages)
+        assert state.image_count == 5
+        prune_images(messages, 3, state)
+        assert image_data(messages) == ["img2", "img3", "img4"]
+        assert state.image_count == 3
+
+    def test_removes_in_chunks(self):
+        messages = [
+            tool_result_message(f"t{i}", [image_block(f"img{i}")]) for i in range(7)
+        ]
+        prune_images(messages, 3, min_removal_threshold=3)
+        assert image_data(messages) == ["img3", "img4", "img5", "img6"]
+        messages.append(tool_result_message("t7", [image_block("img7")]))
+        messages.append(tool_result_message("t8", [image_block("img8")]))
+        prune_images(messages, 3, min_removal_threshold=3)
+        assert image_data(messages) == ["img6", "img7", "img8"]
+
+    def test_make_tool_result_counts_images(self):
+        state = ConversationState()
+        make_tool_result(ToolResult(base64_image="img"), "t0", state)
+        make_tool_result(ToolResult(output="X=1"), "t1", state)
+        make_tool_result(ToolResult(error="boom"), "t2", state)
+        assert state.image_count == 1
+
+
+class TestMakeToolResult:
+    def test_short_output_verbatim(self):
+        block = make_tool_result(ToolResult(output="x" * 100), "t0")
+        assert block["content"] == [{"type": "text", "text": "x" * 100}]
+
+    def test_long_output_keeps_head_and_tail(self):
+        output = "h" * 500 + "m" * 1000 + "t" * 500
+        block = make_tool_result(ToolResult(output=output), "t0", max_output_chars=800)
+        text = block["content"][0]["text"]
+        assert text.startswith("h" * 200 + "\n")
+        assert text.endswith("\n" + "t" * 400)
+        assert "[truncated 1400 chars]" in text
+
+
+class TestPruneConversation:
+    def test_strips_old_thinking(self):
+        messages = conversation(5)
+        prune_conversation(messages, keep_thinking=2)
+        thoughts = [
+            b["thinking"]
+            for m in messages
+            if m["role"] == "assistant"
+            for b in m["content"]
+            if b["type"] == "thinking"
+        ]
+        assert thoughts == ["thought3", "thought4"]
+
+    def test_latest_thinking_always_kept(self):
+        messages = conversation(2)
+        prune_conversation(messages, keep_thinking=0, history_chunk=1)
+        assert messages[-2]["content"][0]["type"] == "thinking"
+
+    def test_collapses_old_failures(self):
+        messages = conversation(2)
+        for m in (messages[2], messages[4]):
+            m["content"][0].update(content="boom\ntraceback", is_error=True)
+        prune_conversation(messages, keep_failures=1, history_chunk=1)
+        assert messages[2]["content"][0]["content"] == "boom"
+        assert messages[4]["content"][0]["content"] == "boom\ntraceback"
+
+    def test_archives_old_turns(self):
+        messages = conversation(20)
+        prune_conversation(messages, archive_after=5, archive_threshold=30)
+        assert messages[0]["content"] == "task"
+        old_assistant, old_user = messages[1], messages[2]
+        assert [b["type"] for b in old_assistant["content"]] == ["tool_use"]
+        assert old_user["content"][0]["content"] == ARCHIVED
+        assert old_user["content"][0]["tool_use_id"] == "t0"
+        assert messages[-1]["content"][0]["content"] != ARCHIVED
+
+    def test_no_archive_under_threshold(self):
+        messages = conversation(5)
+        prune_conversation(messages, archive_after=1, archive_threshold=30)
+        assert all(
+            m["content"][0]["content"] != ARCHIVED
+            for m in messages[1:]
+            if m["role"] == "user"
+        )
+
+    def test_history_pruned_only_at_chunk_boundaries(self):
+        messages = conversation(4)
+        prune_conversation(messages, keep_thinking=1, history_chunk=5)
+        assert all(m["content"][0]["type"] == "thinking" for m in messages[1::2])
+        messages += [assistant_message("t4"), tool_result_message("t4")]
+        prune_conversation(messages, keep_thinking=1, history_chunk=5)
+        assert [m["content"][0]["type"] for m in messages[1::2]] == ["tool_use"] * 4 + [
+            "thinking"
+        ]
+
+    def test_prefix_stable_between_chunk_boundaries(self):
+        messages = [{"role": "user", "content": "task"}]
+        cache_busts = []
+        for turn in range(20):
+            before = json.dumps(messages)
+            messages.append(assistant_message(f"t{turn}"))
+            messages.append(tool_result_message(f"t{turn}", "boom\ntraceback"))
+            messages[-1]["content"][0]["is_error"] = True
+            prune_conversation(
+                messages, keep_images=0, archive_after=2, archive_threshold=10
+            )
+            if json.dumps(messages[: len(messages) - 2]) != before:
+                cache_busts.append(turn + 1)
+        assert cache_busts == [5, 10, 15, 20]
+
+    def test_compacts_over_token_budget(self):
+        messages = conversation(20)
+        messages[1]["content"].insert(0, {"type": "text", "text": "opening cart"})
+        prune_conversation(
+            messages, archive_after=5, archive_threshold=100, compact_threshold=100
+        )
+        assert len(messages) == 11
+        assert messages[1]["role"] == "assistant"
+        assert messages[1]["content"][-1]["id"] == "t15"
+        assert messages[0]["content"][0]["text"] == "task"
+        summary = messages[0]["content"][-1]["text"]
+        assert "opening cart" in summary
+        assert "[computer] action=screenshot" in summary
+
+    def test_no_compaction_under_budget(self):
+        messages = conversation(20)
+        prune_conversation(messages, archive_threshold=100)
+        assert len(messages) == 41
+
+    def test_repeated_compaction_merges_summary(self):
+        messages = conversation(10)
+        _compact_turns(messages, 2)
+        messages += conversation(10)[1:]
+        _compact_turns(messages, 2)
+        summaries = [b["text"] for b in messages[0]["content"][1:]]
+        assert len(summaries) == 1
+        assert summaries[0].count("action=screenshot") == 18
+
+    def test_summary_is_clipped(self):
+        messages = conversation(50)
+        _compact_turns(messages, 1, max_summary_chars=200)
+        summary = messages[0]["content"][-1]["text"]
+        assert len(summary) < 300
+        assert "truncated" in summary
+
+    def test_running_estimate_matches_scan(self):
+        messages = [{"role": "user", "content": "task"}]
+        state = ConversationState()
+        for turn in range(40):
+            messages.append(assistant_message(f"t{turn}"))
+            result = make_tool_result(
+                ToolResult(output="x" * 400, base64_image="img"), f"t{turn}", state
+            )
+            messages.append({"role": "user", "content": [result]})
+            prune_conversation(
+                messages, archive_threshold=20, compact_threshold=5000, state=state
+            )
+            assert state.tokens == _estimate_tokens(messages)
+        assert len(messages) < 40
+
+    def test_running_estimate_skips_rescan(self):
+        messages = conversation(20)
+        state = ConversationState(tokens=10**6, counted=len(messages))
+        prune_conversation(messages, archive_threshold=100, state=state)
+        assert len(messages) == 11
+
+
+class TestEstimateTokens:
+    def test_images_count_fixed_cost(self):
+        assert _estimate_tokens([image_block("x" * 100_000)]) == IMAGE_TOKENS
+
+    def test_text_counts_chars(self):
+        message = {"role": "user", "content": "x" * 400}
+        assert _estimate_tokens([message]) == 100
+
+
+class RecordingTool:
+    """Computer tool stand-in that records when each action starts and ends."""
+
+    width, height = 1440, 900
+    _scaling_target = None
+
+    def __init__(self):
+        self.events = []
+
+    async def __call__(self, action, **kwargs):
+        self.events.append(f"start {action}")
+        await asyncio.sleep(0.02)
+        self.events.append(f"end {action}")
+        return ToolResult(output=action)
+
+
+class TestScheduleTool:
+    async def test_runs_after_dependencies(self):
+        tool = RecordingTool()
+        first = _schedule_tool(tool, {"action": "left_click"}, [])
+        second = _schedule_tool(tool, {"action": "screenshot"}, [first])
+        assert (await second).output == "screenshot"
+        assert tool.events == [
+            "start left_click",
+            "end left_click",
+            "start screenshot",
+            "end screenshot",
+        ]
+
+    async def test_independent_calls_overlap(self):
+        tool = RecordingTool()
+        tasks = [_schedule_tool(tool, {"action": a}, []) for a in ("zoom", "wait")]
+        await asyncio.gather(*tasks)
+        assert tool.events[:2] == ["start zoom", "start wait"]
+
+
+class TestNewEventLoop:
+    def test_falls_back_without_uvloop(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, "uvloop", None)
+        loop = new_event_loop()
+        try:
+            assert isinstance(loop, asyncio.AbstractEventLoop)
+            assert loop.run_until_complete(asyncio.sleep(0, "done")) == "done"
+        finally:
+            loop.close()
+
+
+class FakeStream:
+    """Message stream stand-in that yields each block's stop event in turn."""
+
+    def __init__(self, message, events, error=None):
+        self.message = message
+        self.events = events
+        self.error = error
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def __aiter__(self):
+        for block in self.message.content:
+            yield SimpleNamespace(type="content_block_stop", content_block=block)
+            # Leave time for scheduled calls to start, as network reads would
+            await asyncio.sleep(0.01)
+        if self.error:
+            raise self.error
+        self.events.append("stream done")
+
+    async def get_final_message(self):
+        return self.message
+
+
+def fake_client(turns, events, error=None):
+    """Create a client whose streams replay ``turns`` in order.
+
+    If ``error`` is given, the stream for the last turn raises it after
+    yielding the turn's blocks.
+    """
+    turns = list(turns)
+
+    def stream(**kwargs):
+        message = turns.pop(0)
+        return FakeStream(message, events, None if turns else error)
+
+    messages = SimpleNamespace(stream=stream)
+    return SimpleNamespace(beta=SimpleNamespace(messages=messages))
+
+
+def computer_call(tool_use_id, action):
+    """Create a computer tool_use block as the API returns it."""
+    return BetaToolUseBlock(
+        type="tool_use", id=tool_use_id, name="computer", input={"action": action}
+    )
+
+
+class TestAgentLoop:
+    async def test_streamed_calls_start_early_and_are_recorded(self):
+        tool = RecordingTool()
+        turns = [
+            make_response(
+                [
+                    ParsedBetaTextBlock(type="text", text="looking"),
+                    computer_call("a", "zoom"),
+                    computer_call("b", "left_click"),
+                ]
+            ),
+            make_response([ParsedBetaTextBlock(type="text", text="done")]),
+        ]
+        messages = await agent_loop(
+            prompt="go", client=fake_client(turns, tool.events), tool=tool
+        )
+        assert tool.events.index("start zoom") < tool.events.index("stream done")
+        results = messages[2]["content"]
+        assert [r["tool_use_id"] for r in results] == ["a", "b"]
+        assert [r["content"][0]["text"] for r in results] == ["zoom", "left_click"]
+        assert messages[-1]["content"] == [{"type": "text", "text": "done"}]
+
+    async def test_screenshot_waits_for_wait(self):
+        tool = RecordingTool()
+        turns = [
+            make_response(
+                [computer_call("a", "wait"), computer_call("b", "screenshot")]
+            ),
+            make_response([ParsedBetaTextBlock(type="text", text="done")]),
+        ]
+        await agent_loop(prompt="go", client=fake_client(turns, []), tool=tool)
+        assert tool.events == [
+            "start wait",
+            "end wait",
+            "start screenshot",
+            "end screenshot",
+        ]
+
+    async def test_stream_failure_finishes_started_calls(self):
+        tool = RecordingTool()
+        turn = make_response([computer_call("a", "wait")])
+        client = fake_client([turn], tool.events, error=ConnectionError("dropped"))
+        with pytest.raises(ConnectionError):
+            await agent_loop(prompt="go", client=client, tool=tool)
+        assert tool.events == ["start wait", "end wait"]
+
+    async def test_cancelled_loop_cancels_started_calls(self):
+        tool = RecordingTool()
+        turn = make_response([computer_call("a", "wait")])
+        client = fake_client([turn], tool.events, error=asyncio.CancelledError())
+        with pytest.raises(asyncio.CancelledError):
+            await agent_loop(prompt="go", client=client, tool=tool)
+        assert tool.events == ["start wait"]
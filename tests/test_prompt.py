@@ -0,0 +1,43 @@
+"""Tests for the shopping prompt builder."""
+
+import os
+
+import pytest
+
+from shopping import prompt
+
+
+@pytest.fixture
+def brief(tmp_path, monkeypatch):
+    """Point the prompt builder at a temporary brief."""
+    monkeypatch.setattr(prompt, "DOCS_DIR", tmp_path)
+    path = tmp_path / "shopping-brief.md"
+    path.write_text("wants: jeans")
+    return path
+
+
+class TestLoadBrief:
+    def test_reads_brief(self, brief):
+        assert prompt.load_brief() == "wants: jeans"
+
+    def test_cached_until_modified(self, brief):
+        first = prompt.load_brief()
+        assert prompt.load_brief() is first
+        brief.write_text("wants: boots")
+        stat = brief.stat()
+        os.utime(brief, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert prompt.load_brief() == "wants: boots"
+
+
+class TestBuildPrompts:
+    def test_task_prompt_splits_brief_from_task(self, brief):
+        blocks = prompt.build_task_prompt(3)
+        assert [b["type"] for b in blocks] == ["text", "text"]
+        assert "wants: jeans" in blocks[0]["text"]
+        assert "#3" not in blocks[0]["text"]
+        assert "item #3" in blocks[1]["text"]
+
+    def test_brief_block_shared_across_items(self, brief):
+        first = prompt.build_task_prompt(1)[0]
+        second = prompt.build_task_prompt(2)[0]
+        assert first == second
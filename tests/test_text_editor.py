@@ -4,6 +4,8 @@ import pytest
 
 from shopping.tools.text_editor import TextEditor
 
+SAMPLE = "def hello():\n    print('hello')\n    return True\n"
+
 
 @pytest.fixture
 def tmp_editor(tmp_path):
@@ -14,27 +16,40 @@ def tmp_editor(tmp_path):
 @pytest.fixture
 def sample_file(tmp_path):
     """Create a sample Python file for testing."""
-    content = "def hello():\n    print('hello')\n    return True\n"
     f = tmp_path / "sample.py"
-    f.write_text(content)
+    f.write_text(SAMPLE)
+    return f
+
+
+@pytest.fixture(scope="module")
+def ro_sample(tmp_path_factory):
+    """Create a sample file shared by tests that never modify it."""
+    f = tmp_path_factory.mktemp("ro") / "sample.py"
+    f.write_text(SAMPLE)
     return f
 
 
+@pytest.fixture(scope="module")
+def ro_editor(ro_sample):
+    """Create a TextEditor rooted next to ``ro_sample``, for read-only tests."""
+    return TextEditor(working_directory=ro_sample.parent)
+
+
 class TestView:
-    def test_view_file(self, tmp_editor, sample_file):
-        result = tmp_editor.execute("view", path=sample_file.name)
+    def test_view_file(self, ro_editor, ro_sample):
+        result = ro_editor.execute("view", path=ro_sample.name)
         assert "1: def hello():" in result
         assert "2:     print('hello')" in result
         assert "3:     return True" in result
 
-    def test_view_range(self, tmp_editor, sample_file):
-        result = tmp_editor.execute("view", path=sample_file.name, view_range=[2, 3])
+    def test_view_range(self, ro_editor, ro_sample):
+        result = ro_editor.execute("view", path=ro_sample.name, view_range=[2, 3])
         assert "1:" not in result
         assert "2:     print('hello')" in result
         assert "3:     return True" in result
 
-    def test_view_range_end_negative_one(self, tmp_editor, sample_file):
-        result = tmp_editor.execute("view", path=sample_file.name, view_range=[2, -1])
+    def test_view_range_end_negative_one(self, ro_editor, ro_sample):
+        result = ro_editor.execute("view", path=ro_sample.name, view_range=[2, -1])
         assert "1:" not in result
         assert "2:" in result
         assert "3:" in result
@@ -48,8 +63,8 @@ class TestView:
         assert "b.py" in result
         assert "subdir/" in result
 
-    def test_view_missing_file(self, tmp_editor):
-        result = tmp_editor.execute("view", path="nope.py")
+    def test_view_missing_file(self, ro_editor):
+        result = ro_editor.execute("view", path="nope.py")
         assert "Error" in result
 
 
@@ -62,12 +77,13 @@ class TestStrReplace:
             new_str="print('world')",
         )
         assert "Successfully" in result
-        assert "print('world')" in sample_file.read_text()
+        expected = SAMPLE.replace("print('hello')", "print('world')")
+        assert sample_file.read_text() == expected
 
-    def test_replace_no_match(self, tmp_editor, sample_file):
-        result = tmp_editor.execute(
+    def test_replace_no_match(self, ro_editor, ro_sample):
+        result = ro_editor.execute(
             "str_replace",
-            path=sample_file.name,
+            path=ro_sample.name,
             old_str="nonexistent text",
             new_str="replacement",
         )
@@ -83,8 +99,8 @@ class TestStrReplace:
         # File should be unchanged
         assert f.read_text() == "foo\nfoo\n"
 
-    def test_replace_missing_file(self, tmp_editor):
-        result = tmp_editor.execute(
+    def test_replace_missing_file(self, ro_editor):
+        result = ro_editor.execute(
             "str_replace", path="nope.py", old_str="a", new_str="b"
         )
         assert "Error" in result
@@ -108,6 +124,16 @@ class TestCreate:
             "create", path=sample_file.name, file_text="overwrite"
         )
         assert "Error" in result
+        assert sample_file.read_text() == SAMPLE
+
+    def test_create_over_directory_errors(self, tmp_editor, tmp_path):
+        (tmp_path / "pkg").mkdir()
+        result = tmp_editor.execute("create", path="pkg", file_text="x = 1\n")
+        assert "already exists" in result
+
+    def test_create_writes_unicode(self, tmp_editor, tmp_path):
+        tmp_editor.execute("create", path="notes.md", file_text="café — $5\n")
+        assert (tmp_path / "notes.md").read_text(encoding="utf-8") == "café — $5\n"
 
 
 class TestInsert:
@@ -116,8 +142,7 @@ class TestInsert:
             "insert", path=sample_file.name, insert_line=0, insert_text="# header\n"
         )
         assert "Successfully" in result
-        content = sample_file.read_text()
-        assert content.startswith("# header\n")
+        assert sample_file.read_text() == "# header\n" + SAMPLE
 
     def test_insert_in_middle(self, tmp_editor, sample_file):
         result = tmp_editor.execute(
@@ -127,17 +152,63 @@ class TestInsert:
             insert_text="    # comment\n",
         )
         assert "Successfully" in result
-        lines = sample_file.read_text().splitlines()
-        assert lines[1] == "    # comment"
+        first, rest = SAMPLE.split("\n", 1)
+        assert sample_file.read_text() == f"{first}\n    # comment\n{rest}"
 
-    def test_insert_out_of_range(self, tmp_editor, sample_file):
-        result = tmp_editor.execute(
-            "insert", path=sample_file.name, insert_line=999, insert_text="nope"
+    def test_insert_out_of_range(self, ro_editor, ro_sample):
+        result = ro_editor.execute(
+            "insert", path=ro_sample.name, insert_line=999, insert_text="nope"
         )
         assert "Error" in result
 
-    def test_insert_missing_file(self, tmp_editor):
-        result = tmp_editor.execute(
+    def test_insert_at_end(self, tmp_editor, sample_file):
+        tmp_editor.execute(
+            "insert", path=sample_file.name, insert_line=3, insert_text="hello()"
+        )
+        assert sample_file.read_text() == SAMPLE + "hello()\n"
+
+    def test_insert_after_unterminated_last_line(self, tmp_editor, tmp_path):
+        f = tmp_path / "notes.md"
+        f.write_text("a\nb")
+        tmp_editor.execute("insert", path=f.name, insert_line=2, insert_text="c")
+        assert f.read_text() == "a\nb\nc\n"
+
+    def test_insert_missing_file(self, ro_editor):
+        result = ro_editor.execute(
             "insert", path="nope.py", insert_line=0, insert_text="x"
         )
         assert "Error" in result
+
+
+class TestResolve:
+    def test_absolute_path_is_made_relative(self, tmp_editor, tmp_path):
+        assert tmp_editor._resolve("/repo/a.txt") == tmp_path.resolve() / "repo/a.txt"
+
+    def test_follows_retargeted_symlink(self, tmp_editor, tmp_path):
+        link = tmp_path / "link"
+        link.symlink_to(tmp_path / "a")
+        assert tmp_editor._resolve("link/f.txt") == tmp_path.resolve() / "a/f.txt"
+        link.unlink()
+        link.symlink_to(tmp_path / "b")
+        assert tmp_editor._resolve("link/f.txt") == tmp_path.resolve() / "b/f.txt"
+
+
+class TestFileCache:
+    def test_unchanged_file_not_reread(self, tmp_editor, sample_file, monkeypatch):
+        tmp_editor.execute("view", path=sample_file.name)
+        monkeypatch.setattr(
+            type(sample_file), "read_text", lambda self: pytest.fail("reread")
+        )
+        result = tmp_editor.execute("view", path=sample_file.name)
+        assert "1: def hello():" in result
+
+    def test_write_refreshes_cache(self, tmp_editor, sample_file):
+        tmp_editor.execute(
+            "str_replace", path=sample_file.name, old_str="def hello", new_str="def hi"
+        )
+        assert "1: def hi():" in tmp_editor.execute("view", path=sample_file.name)
+
+    def test_external_change_is_seen(self, tmp_editor, sample_file):
+        tmp_editor.execute("view", path=sample_file.name)
+        sample_file.write_text("changed outside\n")
+        assert tmp_editor.execute("view", path=sample_file.name) == "1: changed outside"
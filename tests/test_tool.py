@@ -1,13 +1,28 @@
 import base64
+import functools
+import itertools
+import time
 from io import BytesIO
-from unittest.mock import AsyncMock, patch
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+import pytest_asyncio
 from PIL import Image
 
-from mac.tool import MacTool, ScalingSource, ToolError, ToolResult
+from mac.tool import (
+    MODIFIER_FLAGS,
+    CGRectMake,
+    MacTool,
+    ScalingSource,
+    ToolError,
+    ToolResult,
+    _find_scaling_target,
+    _post_click,
+)
 
 MOCK_SCREENSHOT = ToolResult(base64_image="fake_base64")
+DISPLAY_SIZE = (1440, 900)
 
 
 @pytest.fixture
@@ -18,14 +33,88 @@ def mock_screenshot_delay():
 
 
 @pytest.fixture
-def mock_screenshot(mock_screenshot_delay):
+def mock_screenshot(mock_screenshot_delay, monkeypatch):
     """Mock both the delay and screenshot for non-screenshot tests."""
-    with patch.object(
-        MacTool, "screenshot", new_callable=AsyncMock, return_value=MOCK_SCREENSHOT
+
+    async def screenshot(self):
+        return MOCK_SCREENSHOT
+
+    monkeypatch.setattr(MacTool, "screenshot", screenshot)
+
+
+@pytest.fixture
+def pag(monkeypatch):
+    """Replace pyautogui in mac.tool with a mock that records input events."""
+    fake = MagicMock()
+    fake.position.return_value = (0, 0)
+    monkeypatch.setattr("mac.tool.pyautogui", fake)
+    return fake
+
+
+@pytest.fixture(scope="module")
+def tool():
+    """Share one MacTool per module, sized as a 1440x900 display.
+
+    The fixed size gives every machine the same 16:10 scaling target, so
+    coordinate tests never depend on, or skip for, the attached display.
+    Tests that change the tool's state must do so through ``monkeypatch``.
+    """
+    with patch(
+        "mac.tool.CGDisplayBounds", return_value=CGRectMake(0, 0, *DISPLAY_SIZE)
+    ):
+        return MacTool()
+
+
+@functools.cache
+def fake_capture(fmt, width, height):
+    """Encode a blank full-screen image the way screencapture would."""
+    buf = BytesIO()
+    Image.new("RGB", (width, height), "blue").save(
+        buf, format="JPEG" if fmt == "jpg" else "PNG"
+    )
+    return buf.getvalue()
+
+
+@pytest.fixture(scope="module")
+def screen(tool, request):
+    """Serve captures from a generated image unless --run-screencapture is set.
+
+    Native capture is disabled and the screencapture subprocess writes
+    ``fake_capture`` bytes, so the fallback path and rescaling still run.
+    """
+    if request.config.getoption("--run-screencapture"):
+        yield
+        return
+
+    async def screencapture(*cmd, **kwargs):
+        fmt = cmd[cmd.index("-t") + 1]
+        Path(cmd[-1]).write_bytes(fake_capture(fmt, tool.width, tool.height))
+        proc = MagicMock(returncode=0)
+        proc.communicate = AsyncMock(return_value=(b"", b""))
+        return proc
+
+    with (
+        patch.object(MacTool, "_capture_display", return_value=None),
+        patch("mac.tool.asyncio.create_subprocess_exec", screencapture),
     ):
         yield
 
 
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def captured(tool, screen):
+    """Capture the screen once for tests that only inspect the result.
+
+    Returns the ``ToolResult`` and the decoded image, or None if the
+    capture failed.
+    """
+    result = await tool.screenshot()
+    if result.base64_image is None:
+        return result, None
+    img = Image.open(BytesIO(base64.b64decode(result.base64_image)))
+    img.load()
+    return result, img
+
+
 class TestToolResult:
     def test_defaults_to_none(self):
         result = ToolResult()
@@ -46,42 +135,123 @@ class TestToolResult:
 
     def test_with_image(self):
         result = ToolResult(output="hello")
-        updated = result.with_image("img_data")
+        updated = result.with_image("img_data", "image/jpeg")
         assert updated.output == "hello"
         assert updated.base64_image == "img_data"
+        assert updated.media_type == "image/jpeg"
 
 
-class TestScreenshot:
-    @pytest.fixture
-    def tool(self):
-        return MacTool()
+class TestDispatch:
+    async def test_unknown_action_returns_error(self, tool):
+        result = await tool("teleport")
+        assert result.error == "unknown action: teleport"
 
-    async def test_returns_base64_image(self, tool):
-        result = await tool.screenshot()
+    async def test_routes_action_with_its_inputs(self, tool, pag, mock_screenshot):
+        result = await tool("key", text="super+c")
+        pag.hotkey.assert_called_once_with("command", "c")
+        assert result.error is None
+
+    async def test_ignores_inputs_for_other_actions(self, tool):
+        result = await tool("cursor_position", text=None, region=None, foo=1)
+        assert result.error is None
+        assert result.output is not None
+
+    async def test_click_receives_action(self, tool, mock_screenshot, pag):
+        with patch("mac.tool._post_click") as mock_click:
+            await tool("double_click", coordinate=(100, 100))
+        assert mock_click.call_args.args[2:4] == ("left", 2)
+
+
+@pytest.mark.usefixtures("screen")
+class TestScreenshot:
+    def test_returns_base64_image(self, captured):
+        result, _ = captured
         assert result.error is None
         assert result.base64_image is not None
 
-    async def test_decoded_image_is_valid_png(self, tool):
+    def test_decoded_image_is_valid_jpeg(self, captured):
+        result, img = captured
+        assert img.format == "JPEG"
+        assert result.media_type == "image/jpeg"
+
+    async def test_png_format(self):
+        tool = MacTool(image_format="png")
         result = await tool.screenshot()
         image_bytes = base64.b64decode(result.base64_image)
         img = Image.open(BytesIO(image_bytes))
         assert img.format == "PNG"
+        assert result.media_type == "image/png"
 
-    async def test_scaled_dimensions(self, tool):
-        if tool._scaling_target is None:
-            pytest.skip("No scaling target for this display")
-        result = await tool.screenshot()
-        image_bytes = base64.b64decode(result.base64_image)
-        with Image.open(BytesIO(image_bytes)) as img:
-            assert img.width == tool._scaling_target.width
-            assert img.height == tool._scaling_target.height
+    async def test_uses_native_capture(self, tool):
+        with (
+            patch.object(MacTool, "_capture_native", return_value=b"native"),
+            patch("mac.tool.asyncio.create_subprocess_exec") as spawn,
+        ):
+            result = await tool.screenshot()
+        spawn.assert_not_called()
+        assert base64.b64decode(result.base64_image) == b"native"
+        assert result.media_type == "image/jpeg"
+
+    async def test_falls_back_to_screencapture(self, tool):
+        with patch.object(MacTool, "_capture_native", return_value=None):
+            result = await tool.screenshot()
+        assert result.error is None
+        assert result.base64_image is not None
 
+    def test_native_capture_uses_nominal_resolution(self, tool):
+        with patch.object(MacTool, "_capture_display", return_value=None) as capture:
+            assert tool._capture_native() is None
+        capture.assert_called_once_with(nominal=tool._scaling_target is not None)
 
-class TestKey:
+    def test_bitmap_context_reused(self, tool):
+        with (
+            patch("mac.tool.CGBitmapContextCreate", side_effect=lambda *a: object()),
+            patch("mac.tool.CGContextSetInterpolationQuality"),
+        ):
+            first = tool._bitmap_context(100, 50)
+            assert tool._bitmap_context(100, 50) is first
+            assert tool._bitmap_context(200, 100) is not first
+
+    def test_unsupported_format_raises(self):
+        with pytest.raises(ValueError):
+            MacTool(image_format="gif")
+
+    def test_scaled_dimensions(self, tool, captured):
+        _, img = captured
+        assert img.width == tool._scaling_target.width
+        assert img.height == tool._scaling_target.height
+
+
+class TestWaitForSettle:
     @pytest.fixture
     def tool(self):
-        return MacTool()
+        with (
+            patch("mac.tool.SCREENSHOT_DELAY", 0.5),
+            patch("mac.tool.SETTLE_MIN_WAIT", 0),
+        ):
+            yield MacTool()
+
+    async def test_returns_once_screen_is_stable(self, tool):
+        with patch.object(MacTool, "_thumbnail", return_value=b"same"):
+            start = time.monotonic()
+            await tool._wait_for_settle()
+        assert time.monotonic() - start < 0.4
+
+    async def test_caps_wait_while_screen_changes(self, tool):
+        frames = (str(i).encode() for i in itertools.count())
+        with patch.object(MacTool, "_thumbnail", side_effect=lambda: next(frames)):
+            start = time.monotonic()
+            await tool._wait_for_settle()
+        assert 0.45 <= time.monotonic() - start < 0.7
+
+    async def test_sleeps_full_delay_without_capture(self, tool):
+        with patch.object(MacTool, "_thumbnail", return_value=None):
+            start = time.monotonic()
+            await tool._wait_for_settle()
+        assert time.monotonic() - start >= 0.45
 
+
+class TestKey:
     async def test_missing_text_returns_error(self, tool):
         result = await tool.key(None)
         assert result.error is not None
@@ -91,57 +261,74 @@ class TestKey:
         assert result.error is not None
         assert "unrecognized" in result.error
 
-    async def test_single_key(self, tool, mock_screenshot):
-        with patch("mac.tool.pyautogui.press") as mock_press:
-            result = await tool.key("Return")
-            mock_press.assert_called_once_with("return")
+    async def test_single_key(self, tool, pag, mock_screenshot):
+        result = await tool.key("Return")
+        pag.press.assert_called_once_with("return")
         assert result.error is None
         assert result.base64_image is not None
 
-    async def test_key_combo(self, tool, mock_screenshot):
-        with patch("mac.tool.pyautogui.hotkey") as mock_hotkey:
-            result = await tool.key("super+c")
-            mock_hotkey.assert_called_once_with("command", "c")
+    async def test_key_combo(self, tool, pag, mock_screenshot):
+        result = await tool.key("super+c")
+        pag.hotkey.assert_called_once_with("command", "c")
         assert result.error is None
         assert result.base64_image is not None
 
+    def test_parse_combo(self, tool):
+        assert tool._parse_combo("ctrl+shift+t") == (("ctrl", "shift", "t"), ())
+        assert tool._parse_combo("super+bogus") == (("command", "bogus"), ("bogus",))
+
     async def test_maps_x11_keys(self, tool):
         assert tool._map_key("super") == "command"
         assert tool._map_key("Return") == "return"
         assert tool._map_key("alt") == "option"
         assert tool._map_key("BackSpace") == "backspace"
 
+    def test_maps_case_variants(self, tool):
+        assert tool._map_key("RETURN") == "return"
+        assert tool._map_key("super_l") == "command"
+        assert tool._map_key("A") == "a"
 
-class TestType:
-    @pytest.fixture
-    def tool(self):
-        return MacTool()
 
+class TestType:
     async def test_missing_text_returns_error(self, tool):
         result = await tool.type(None)
         assert result.error is not None
 
-    async def test_types_text(self, tool, mock_screenshot):
-        with patch("mac.tool.pyautogui.write") as mock_write:
-            result = await tool.type("hello world")
-            mock_write.assert_called_once_with("hello world", interval=0.012)
+    async def test_types_text(self, tool, pag, mock_screenshot):
+        result = await tool.type("hello world")
+        pag.write.assert_called_once_with("hello world", interval=0.012)
         assert result.error is None
         assert result.base64_image is not None
 
 
-class TestScaleCoordinates:
-    @pytest.fixture
-    def tool(self):
-        return MacTool()
+class TestFindScalingTarget:
+    def test_matches_macbook_air(self):
+        assert _find_scaling_target(1470, 956).name == "MBA13"
+
+    def test_matches_16_10(self):
+        assert _find_scaling_target(1728, 1080).name == "WXGA"
 
-    def test_no_scaling_target_passthrough(self, tool):
-        tool._scaling_target = None
+    def test_no_target_when_display_is_smaller(self):
+        assert _find_scaling_target(1024, 768) is None
+
+    def test_no_target_for_unknown_ratio(self):
+        assert _find_scaling_target(3440, 1440) is None
+
+
+class TestScaleCoordinates:
+    def test_no_scaling_target_passthrough(self, tool, monkeypatch):
+        monkeypatch.setattr(tool, "_scaling_target", None)
         assert tool.scale_coordinates(ScalingSource.API, 500, 300) == (500, 300)
         assert tool.scale_coordinates(ScalingSource.COMPUTER, 500, 300) == (500, 300)
 
+    def test_bounds_follow_scaling_target(self, tool, monkeypatch):
+        monkeypatch.setattr(tool, "_scaling_target", None)
+        assert tool.scale_coordinates(ScalingSource.API, tool.width, tool.height) == (
+            tool.width,
+            tool.height,
+        )
+
     def test_api_to_screen_scales_up(self, tool):
-        if tool._scaling_target is None:
-            pytest.skip("No scaling target for this display")
         # A point in the middle of the scaled image should map to
         # roughly the middle of the real screen
         mid_x = tool._scaling_target.width // 2
@@ -151,8 +338,6 @@ class TestScaleCoordinates:
         assert abs(sy - tool.height // 2) <= 1
 
     def test_screen_to_api_scales_down(self, tool):
-        if tool._scaling_target is None:
-            pytest.skip("No scaling target for this display")
         mid_x = tool.width // 2
         mid_y = tool.height // 2
         ax, ay = tool.scale_coordinates(ScalingSource.COMPUTER, mid_x, mid_y)
@@ -163,13 +348,21 @@ class TestScaleCoordinates:
         with pytest.raises(ToolError):
             tool.scale_coordinates(ScalingSource.API, 99999, 99999)
 
+    def test_batch_matches_single_calls(self, tool):
+        points = ((10, 20), (300, 150))
+        assert tool._scale_api_to_screen(points) == [
+            tool.scale_coordinates(ScalingSource.API, x, y) for x, y in points
+        ]
+
+    def test_batch_rejects_any_out_of_bounds(self, tool):
+        with pytest.raises(ToolError):
+            tool._scale_api_to_screen(((0, 0), (99999, 99999)))
+
     def test_negative_coords_raises_error(self, tool):
         with pytest.raises(ToolError):
             tool.scale_coordinates(ScalingSource.API, -1, 100)
 
     def test_roundtrip(self, tool):
-        if tool._scaling_target is None:
-            pytest.skip("No scaling target for this display")
         # API -> screen -> API should give back ~the same coordinates
         original = (400, 300)
         screen = tool.scale_coordinates(ScalingSource.API, *original)
@@ -179,10 +372,6 @@ class TestScaleCoordinates:
 
 
 class TestMouseMove:
-    @pytest.fixture
-    def tool(self):
-        return MacTool()
-
     async def test_missing_coordinate_returns_error(self, tool):
         result = await tool.mouse_move(coordinate=None)
         assert result.error is not None
@@ -191,79 +380,78 @@ class TestMouseMove:
         result = await tool.mouse_move(text="hello", coordinate=(100, 100))
         assert result.error is not None
 
-    async def test_moves_with_scaled_coordinates(self, tool, mock_screenshot):
-        with patch("mac.tool.pyautogui.moveTo") as mock_move:
-            result = await tool.mouse_move(coordinate=(100, 100))
-            expected = tool.scale_coordinates(ScalingSource.API, 100, 100)
-            mock_move.assert_called_once_with(*expected)
+    async def test_moves_with_scaled_coordinates(self, tool, pag, mock_screenshot):
+        result = await tool.mouse_move(coordinate=(100, 100))
+        expected = tool.scale_coordinates(ScalingSource.API, 100, 100)
+        pag.moveTo.assert_called_once_with(*expected)
         assert result.error is None
         assert result.base64_image is not None
 
 
 class TestClick:
-    @pytest.fixture
-    def tool(self):
-        return MacTool()
-
     async def test_text_not_accepted(self, tool):
         result = await tool.click("left_click", text="hello")
         assert result.error is not None
 
-    async def test_click_at_coordinate(self, tool, mock_screenshot):
-        with (
-            patch("mac.tool.pyautogui.moveTo") as mock_move,
-            patch("mac.tool.pyautogui.click") as mock_click,
-        ):
+    async def test_click_at_coordinate(self, tool, pag, mock_screenshot):
+        with patch("mac.tool._post_click") as mock_click:
             result = await tool.click("left_click", coordinate=(100, 100))
             expected = tool.scale_coordinates(ScalingSource.API, 100, 100)
-            mock_move.assert_called_once_with(*expected)
-            mock_click.assert_called_once_with(button="left", clicks=1)
+            pag.moveTo.assert_called_once_with(*expected)
+            mock_click.assert_called_once_with(*expected, "left", 1, 0)
         assert result.error is None
         assert result.base64_image is not None
 
-    async def test_click_without_coordinate(self, tool, mock_screenshot):
-        with (
-            patch("mac.tool.pyautogui.moveTo") as mock_move,
-            patch("mac.tool.pyautogui.click") as mock_click,
-        ):
+    async def test_click_without_coordinate(self, tool, pag, mock_screenshot):
+        pag.position.return_value = (10, 20)
+        with patch("mac.tool._post_click") as mock_click:
             result = await tool.click("left_click")
-            mock_move.assert_not_called()
-            mock_click.assert_called_once_with(button="left", clicks=1)
+            pag.moveTo.assert_not_called()
+            mock_click.assert_called_once_with(10, 20, "left", 1, 0)
         assert result.error is None
 
-    async def test_click_with_modifier_key(self, tool, mock_screenshot):
-        with (
-            patch("mac.tool.pyautogui.click") as mock_click,
-            patch("mac.tool.pyautogui.keyDown") as mock_down,
-            patch("mac.tool.pyautogui.keyUp") as mock_up,
-        ):
+    async def test_click_with_modifier_key(self, tool, pag, mock_screenshot):
+        with patch("mac.tool._post_click") as mock_click:
             await tool.click("left_click", key="shift")
-            mock_down.assert_called_once_with("shift")
-            mock_click.assert_called_once_with(button="left", clicks=1)
-            mock_up.assert_called_once_with("shift")
-
-    @pytest.mark.parametrize(
-        "action,button,clicks",
-        [
+            pag.keyDown.assert_not_called()
+            flags = mock_click.call_args.args[4]
+            assert flags == MODIFIER_FLAGS["shift"]
+
+    async def test_click_holding_non_modifier_key(self, tool, pag, mock_screenshot):
+        with patch("mac.tool._post_click") as mock_click:
+            await tool.click("left_click", key="a")
+            pag.keyDown.assert_called_once_with("a")
+            assert mock_click.call_args.args[4] == 0
+            pag.keyUp.assert_called_once_with("a")
+
+    async def test_click_variants(self, tool, mock_screenshot, pag):
+        variants = [
             ("left_click", "left", 1),
             ("right_click", "right", 1),
             ("middle_click", "middle", 1),
             ("double_click", "left", 2),
             ("triple_click", "left", 3),
-        ],
-    )
-    async def test_click_variants(self, tool, mock_screenshot, action, button, clicks):
-        with patch("mac.tool.pyautogui.click") as mock_click:
-            result = await tool.click(action)
-            mock_click.assert_called_once_with(button=button, clicks=clicks)
-        assert result.error is None
+        ]
+        with patch("mac.tool._post_click") as mock_click:
+            for action, button, clicks in variants:
+                result = await tool.click(action)
+                assert result.error is None, action
+                assert mock_click.call_args.args[2:4] == (button, clicks), action
 
 
-class TestLeftClickDrag:
-    @pytest.fixture
-    def tool(self):
-        return MacTool()
+class TestPostClick:
+    def test_double_click_increments_click_state(self):
+        with (
+            patch("mac.tool.CGEventCreateMouseEvent", side_effect=lambda *a: a),
+            patch("mac.tool.CGEventSetIntegerValueField") as mock_state,
+            patch("mac.tool.CGEventPost") as mock_post,
+        ):
+            _post_click(5, 6, "left", 2)
+        assert [c.args[2] for c in mock_state.call_args_list] == [1, 1, 2, 2]
+        assert mock_post.call_count == 4
 
+
+class TestLeftClickDrag:
     async def test_text_not_accepted(self, tool):
         result = await tool.left_click_drag(
             text="hello", start_coordinate=(0, 0), coordinate=(100, 100)
@@ -280,46 +468,30 @@ class TestLeftClickDrag:
         assert result.error is not None
         assert "coordinate" in result.error
 
-    async def test_drags_between_scaled_coordinates(self, tool, mock_screenshot):
-        with (
-            patch("mac.tool.pyautogui.moveTo") as mock_move,
-            patch("mac.tool.pyautogui.mouseDown") as mock_down,
-            patch("mac.tool.pyautogui.mouseUp") as mock_up,
-        ):
-            result = await tool.left_click_drag(
-                start_coordinate=(100, 100), coordinate=(500, 400)
-            )
-            start = tool.scale_coordinates(ScalingSource.API, 100, 100)
-            end = tool.scale_coordinates(ScalingSource.API, 500, 400)
-            assert mock_move.call_args_list == [
-                (start,),
-                (end,),
-            ]
-            mock_down.assert_called_once_with(button="left")
-            mock_up.assert_called_once_with(button="left")
+    async def test_drags_between_scaled_coordinates(self, tool, pag, mock_screenshot):
+        result = await tool.left_click_drag(
+            start_coordinate=(100, 100), coordinate=(500, 400)
+        )
+        start = tool.scale_coordinates(ScalingSource.API, 100, 100)
+        end = tool.scale_coordinates(ScalingSource.API, 500, 400)
+        assert pag.moveTo.call_args_list == [
+            (start,),
+            (end,),
+        ]
+        pag.mouseDown.assert_called_once_with(button="left")
+        pag.mouseUp.assert_called_once_with(button="left")
         assert result.error is None
         assert result.base64_image is not None
 
-    async def test_drag_with_modifier_key(self, tool, mock_screenshot):
-        with (
-            patch("mac.tool.pyautogui.moveTo"),
-            patch("mac.tool.pyautogui.mouseDown"),
-            patch("mac.tool.pyautogui.mouseUp"),
-            patch("mac.tool.pyautogui.keyDown") as mock_key_down,
-            patch("mac.tool.pyautogui.keyUp") as mock_key_up,
-        ):
-            await tool.left_click_drag(
-                start_coordinate=(100, 100), coordinate=(500, 400), key="shift"
-            )
-            mock_key_down.assert_called_once_with("shift")
-            mock_key_up.assert_called_once_with("shift")
+    async def test_drag_with_modifier_key(self, tool, pag, mock_screenshot):
+        await tool.left_click_drag(
+            start_coordinate=(100, 100), coordinate=(500, 400), key="shift"
+        )
+        pag.keyDown.assert_called_once_with("shift")
+        pag.keyUp.assert_called_once_with("shift")
 
 
 class TestHoldKey:
-    @pytest.fixture
-    def tool(self):
-        return MacTool()
-
     async def test_missing_text_returns_error(self, tool):
         result = await tool.hold_key(duration=1)
         assert result.error is not None
@@ -336,35 +508,23 @@ class TestHoldKey:
         result = await tool.hold_key(text="shift", duration=101)
         assert result.error is not None
 
-    async def test_holds_key_for_duration(self, tool, mock_screenshot):
-        with (
-            patch("mac.tool.pyautogui.keyDown") as mock_down,
-            patch("mac.tool.pyautogui.keyUp") as mock_up,
-            patch("mac.tool.asyncio.sleep") as mock_sleep,
-        ):
+    async def test_holds_key_for_duration(self, tool, pag, mock_screenshot):
+        with patch("mac.tool.asyncio.sleep") as mock_sleep:
             result = await tool.hold_key(text="shift", duration=2)
-            mock_down.assert_called_once_with("shift")
+            pag.keyDown.assert_called_once_with("shift")
             mock_sleep.assert_any_call(2)
-            mock_up.assert_called_once_with("shift")
+            pag.keyUp.assert_called_once_with("shift")
         assert result.error is None
         assert result.base64_image is not None
 
-    async def test_maps_x11_key(self, tool, mock_screenshot):
-        with (
-            patch("mac.tool.pyautogui.keyDown") as mock_down,
-            patch("mac.tool.pyautogui.keyUp") as mock_up,
-            patch("mac.tool.asyncio.sleep"),
-        ):
+    async def test_maps_x11_key(self, tool, pag, mock_screenshot):
+        with patch("mac.tool.asyncio.sleep"):
             await tool.hold_key(text="super", duration=1)
-            mock_down.assert_called_once_with("command")
-            mock_up.assert_called_once_with("command")
+            pag.keyDown.assert_called_once_with("command")
+            pag.keyUp.assert_called_once_with("command")
 
 
 class TestWait:
-    @pytest.fixture
-    def tool(self):
-        return MacTool()
-
     async def test_missing_duration_returns_error(self, tool):
         result = await tool.wait()
         assert result.error is not None
@@ -394,10 +554,6 @@ def make_screenshot_result(width=200, height=200):
 
 
 class TestZoom:
-    @pytest.fixture
-    def tool(self):
-        return MacTool()
-
     async def test_missing_region_returns_error(self, tool):
         result = await tool.zoom()
         assert result.error is not None
@@ -423,16 +579,13 @@ class TestZoom:
         assert result.error is None
         assert result.base64_image is not None
         img = Image.open(BytesIO(base64.b64decode(result.base64_image)))
-        assert img.format == "PNG"
+        assert img.format == "JPEG"
+        assert result.media_type == "image/jpeg"
         assert img.width > 0
         assert img.height > 0
 
 
 class TestScroll:
-    @pytest.fixture
-    def tool(self):
-        return MacTool()
-
     async def test_missing_direction_returns_error(self, tool):
         result = await tool.scroll(scroll_amount=3)
         assert result.error is not None
@@ -449,87 +602,63 @@ class TestScroll:
         result = await tool.scroll(scroll_direction="up", scroll_amount=-1)
         assert result.error is not None
 
-    async def test_scroll_up(self, tool, mock_screenshot):
-        with patch("mac.tool.pyautogui.scroll") as mock_scroll:
-            result = await tool.scroll(scroll_direction="up", scroll_amount=3)
-            mock_scroll.assert_called_once_with(3)
+    async def test_scroll_up(self, tool, pag, mock_screenshot):
+        result = await tool.scroll(scroll_direction="up", scroll_amount=3)
+        pag.scroll.assert_called_once_with(3)
         assert result.error is None
         assert result.base64_image is not None
 
-    async def test_scroll_down(self, tool, mock_screenshot):
-        with patch("mac.tool.pyautogui.scroll") as mock_scroll:
-            await tool.scroll(scroll_direction="down", scroll_amount=5)
-            mock_scroll.assert_called_once_with(-5)
-
-    async def test_scroll_left(self, tool, mock_screenshot):
-        with patch("mac.tool.pyautogui.hscroll") as mock_hscroll:
-            await tool.scroll(scroll_direction="left", scroll_amount=2)
-            mock_hscroll.assert_called_once_with(-2)
-
-    async def test_scroll_right(self, tool, mock_screenshot):
-        with patch("mac.tool.pyautogui.hscroll") as mock_hscroll:
-            await tool.scroll(scroll_direction="right", scroll_amount=4)
-            mock_hscroll.assert_called_once_with(4)
-
-    async def test_scroll_at_coordinate(self, tool, mock_screenshot):
-        with patch("mac.tool.pyautogui.scroll") as mock_scroll:
-            await tool.scroll(
-                coordinate=(100, 100), scroll_direction="up", scroll_amount=3
-            )
-            expected = tool.scale_coordinates(ScalingSource.API, 100, 100)
-            mock_scroll.assert_called_once_with(3, x=expected[0], y=expected[1])
+    async def test_scroll_down(self, tool, pag, mock_screenshot):
+        await tool.scroll(scroll_direction="down", scroll_amount=5)
+        pag.scroll.assert_called_once_with(-5)
 
-    async def test_scroll_with_modifier_key(self, tool, mock_screenshot):
-        with (
-            patch("mac.tool.pyautogui.scroll") as mock_scroll,
-            patch("mac.tool.pyautogui.keyDown") as mock_down,
-            patch("mac.tool.pyautogui.keyUp") as mock_up,
-        ):
-            await tool.scroll(scroll_direction="up", scroll_amount=3, text="ctrl")
-            mock_down.assert_called_once_with("ctrl")
-            mock_scroll.assert_called_once_with(3)
-            mock_up.assert_called_once_with("ctrl")
+    async def test_scroll_left(self, tool, pag, mock_screenshot):
+        await tool.scroll(scroll_direction="left", scroll_amount=2)
+        pag.hscroll.assert_called_once_with(-2)
 
+    async def test_scroll_right(self, tool, pag, mock_screenshot):
+        await tool.scroll(scroll_direction="right", scroll_amount=4)
+        pag.hscroll.assert_called_once_with(4)
 
-class TestMouseButton:
-    @pytest.fixture
-    def tool(self):
-        return MacTool()
+    async def test_scroll_at_coordinate(self, tool, pag, mock_screenshot):
+        await tool.scroll(coordinate=(100, 100), scroll_direction="up", scroll_amount=3)
+        expected = tool.scale_coordinates(ScalingSource.API, 100, 100)
+        pag.scroll.assert_called_once_with(3, x=expected[0], y=expected[1])
+
+    async def test_scroll_with_modifier_key(self, tool, pag, mock_screenshot):
+        await tool.scroll(scroll_direction="up", scroll_amount=3, text="ctrl")
+        pag.keyDown.assert_called_once_with("ctrl")
+        pag.scroll.assert_called_once_with(3)
+        pag.keyUp.assert_called_once_with("ctrl")
 
-    async def test_mouse_down(self, tool, mock_screenshot):
-        with patch("mac.tool.pyautogui.mouseDown") as mock_down:
-            result = await tool.mouse_button("left_mouse_down")
-            mock_down.assert_called_once_with(button="left")
+
+class TestMouseButton:
+    async def test_mouse_down(self, tool, pag, mock_screenshot):
+        result = await tool.mouse_button("left_mouse_down")
+        pag.mouseDown.assert_called_once_with(button="left")
         assert result.error is None
         assert result.base64_image is not None
 
-    async def test_mouse_up(self, tool, mock_screenshot):
-        with patch("mac.tool.pyautogui.mouseUp") as mock_up:
-            result = await tool.mouse_button("left_mouse_up")
-            mock_up.assert_called_once_with(button="left")
+    async def test_mouse_up(self, tool, pag, mock_screenshot):
+        result = await tool.mouse_button("left_mouse_up")
+        pag.mouseUp.assert_called_once_with(button="left")
         assert result.error is None
         assert result.base64_image is not None
 
 
 class TestCursorPosition:
-    @pytest.fixture
-    def tool(self):
-        return MacTool()
-
-    async def test_returns_scaled_coordinates(self, tool):
-        with patch("mac.tool.pyautogui.position") as mock_pos:
-            mock_pos.return_value = type(
-                "Point", (), {"x": tool.width // 2, "y": tool.height // 2}
-            )()
-            result = await tool.cursor_position()
+    async def test_returns_scaled_coordinates(self, tool, pag):
+        pag.position.return_value = type(
+            "Point", (), {"x": tool.width // 2, "y": tool.height // 2}
+        )()
+        result = await tool.cursor_position()
         expected = tool.scale_coordinates(
             ScalingSource.COMPUTER, tool.width // 2, tool.height // 2
         )
         assert result.output == f"X={expected[0]},Y={expected[1]}"
         assert result.error is None
 
-    async def test_no_screenshot_attached(self, tool):
-        with patch("mac.tool.pyautogui.position") as mock_pos:
-            mock_pos.return_value = type("Point", (), {"x": 0, "y": 0})()
-            result = await tool.cursor_position()
+    async def test_no_screenshot_attached(self, tool, pag):
+        pag.position.return_value = type("Point", (), {"x": 0, "y": 0})()
+        result = await tool.cursor_position()
         assert result.base64_image is None